@@ -0,0 +1,165 @@
+"""
+Runs every topic x prompt-variant combination through debate.run_debate,
+several at a time.
+
+    python batch_debate.py --topics topics.txt --variants variants.json \
+        --out-dir runs --concurrency 8 --rpm 300
+
+topics.txt has one topic per line (or is a JSON list). variants.json maps a
+variant name to system-prompt overrides by agent name, e.g.
+    {"baseline": {}, "terse": {"Debater_A": "...", "Debater_B": "..."}}
+
+Each run is saved to <out-dir>/<run_id>.json, with its messages logged to
+<out-dir>/<run_id>.jsonl as they are produced. Finished runs are skipped when
+the batch is restarted, and every outcome is appended to <out-dir>/progress.jsonl.
+With --archive DIR, the logs of this batch's finished runs are compacted into
+the Parquet archive at the end. With --results-db PATH, every verdict also
+updates the SQLite results database and its leaderboard as it comes in
+(see results_db.py).
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import asyncio
+import argparse
+import threading
+import itertools
+
+from debate import run_debate, MATCH_MODE, NUM_ROUNDS, WIN_TARGET
+from transcript_store import compact
+from results_db import ResultsDB
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` calls per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_topics(path):
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".json"):
+        return json.loads(text)
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def load_variants(path):
+    if not path:
+        return {"default": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_id(topic, variant, repeat):
+    slug = re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")[:40]
+    digest = hashlib.sha1(topic.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}__{variant}__{repeat}"
+
+
+async def run_batch(topics, variants, out_dir, concurrency=4, rpm=None, repeats=1,
+                    mode=MATCH_MODE, num_rounds=NUM_ROUNDS, win_target=WIN_TARGET, archive_dir=None, results_path=None):
+    os.makedirs(out_dir, exist_ok=True)
+    results_db = ResultsDB(results_path) if results_path else None
+    progress_path = os.path.join(out_dir, "progress.jsonl")
+    progress_lock = threading.Lock()
+    bucket = TokenBucket(rpm / 60.0) if rpm else None
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def record(entry):
+        with progress_lock, open(progress_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    jobs = []
+    for topic, (variant, prompts), repeat in itertools.product(topics, variants.items(), range(repeats)):
+        rid = run_id(topic, variant, repeat)
+        output_path = os.path.join(out_dir, f"{rid}.json")
+        if os.path.exists(output_path):
+            continue  # finished in an earlier invocation
+        jobs.append((rid, topic, variant, prompts, output_path))
+
+    print(f"{len(jobs)} runs to go ({len(topics) * len(variants) * repeats} total), concurrency={concurrency}")
+    done = 0
+    finished_logs = []
+
+    async def run_one(rid, topic, variant, prompts, output_path):
+        nonlocal done
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(
+                    run_debate,
+                    topic=topic,
+                    prompts=prompts,
+                    output_path=output_path,
+                    mode=mode,
+                    num_rounds=num_rounds,
+                    win_target=win_target,
+                    before_llm_call=bucket.acquire if bucket else None,
+                    metadata={"run_id": rid, "variant": variant},
+                    results_db=results_db,
+                    verbose=False,
+                )
+                entry = {"run_id": rid, "status": "done", "winner": result["winner"]}
+                finished_logs.append(os.path.splitext(output_path)[0] + ".jsonl")
+            except Exception as e:
+                entry = {"run_id": rid, "status": "error", "error": str(e)}
+            entry["seconds"] = round(time.perf_counter() - started, 2)
+            record(entry)
+            done += 1
+            print(f"[{done}/{len(jobs)}] {rid}: {entry['status']} ({entry['seconds']}s)")
+
+    await asyncio.gather(*(run_one(*job) for job in jobs))
+
+    if archive_dir and finished_logs:
+        part_path = await asyncio.to_thread(compact, finished_logs, archive_dir)
+        print(f"Archived {len(finished_logs)} transcripts to {part_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", required=True, help="text file (one per line) or JSON list")
+    parser.add_argument("--variants", help="JSON file of {variant: {agent: system_message}}")
+    parser.add_argument("--out-dir", default="runs")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=None, help="max model calls per minute across all runs")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--mode", default=MATCH_MODE, choices=["best_of", "first_to", "fixed"])
+    parser.add_argument("--rounds", type=int, default=NUM_ROUNDS)
+    parser.add_argument("--win-target", type=int, default=WIN_TARGET)
+    parser.add_argument("--archive", help="compact finished transcripts into this Parquet archive directory")
+    parser.add_argument("--results-db", help="record verdicts and Elo ratings in this SQLite database")
+    args = parser.parse_args()
+
+    asyncio.run(run_batch(
+        load_topics(args.topics),
+        load_variants(args.variants),
+        args.out_dir,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        repeats=args.repeats,
+        mode=args.mode,
+        num_rounds=args.rounds,
+        win_target=args.win_target,
+        archive_dir=args.archive,
+        results_path=args.results_db,
+    ))
@@ -0,0 +1,231 @@
+"""
+Keyword analysis over a whole corpus of debates, out of core.
+
+    python corpus_nlp.py runs/*.jsonl --workers 8
+    python corpus_nlp.py debate_archive --workers 8
+
+Transcripts (JSONL logs, debate_history.json files or a Parquet archive) are
+split into chunks and tokenized in a process pool with a HashingVectorizer, so
+no vocabulary is held in memory and each worker only ever sees one chunk. Each
+chunk comes back as term-count sums per (round, debater) plus document
+frequencies, all fixed-width vectors of N_FEATURES, and those partials are just
+added up. The reports match nlp.py's: top keywords overall, per debater and
+per round, scored by tf-idf with a corpus-wide idf.
+"""
+import os
+import re
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from transcript_store import read_messages
+
+N_FEATURES = 2 ** 20
+FILES_PER_CHUNK = 50
+ROW_GROUPS_PER_CHUNK = 4
+
+_PREFIX = re.compile(r"^\s*Debater_[AB]:\s*", re.IGNORECASE)
+
+
+def _vectorizer():
+    return HashingVectorizer(
+        n_features=N_FEATURES,
+        stop_words="english",
+        alternate_sign=False,
+        norm=None,
+    )
+
+
+def make_chunks(paths):
+    """
+    Work units for the pool: ("files", [paths]) for transcript files and
+    ("parquet", path, [row groups]) for each slice of a Parquet archive.
+    """
+    chunks = []
+    files = []
+    for path in paths:
+        if path.endswith(".parquet") or os.path.isdir(path):
+            import pyarrow.parquet as pq
+            parts = [path] if path.endswith(".parquet") else sorted(glob.glob(os.path.join(path, "*.parquet")))
+            for part in parts:
+                n_groups = pq.ParquetFile(part).num_row_groups
+                for start in range(0, n_groups, ROW_GROUPS_PER_CHUNK):
+                    chunks.append(("parquet", part, list(range(start, min(start + ROW_GROUPS_PER_CHUNK, n_groups)))))
+        else:
+            files.append(path)
+    for start in range(0, len(files), FILES_PER_CHUNK):
+        chunks.append(("files", files[start:start + FILES_PER_CHUNK]))
+    return chunks
+
+
+def _load_chunk(chunk):
+    if chunk[0] == "parquet":
+        import pyarrow.parquet as pq
+        _, path, row_groups = chunk
+        table = pq.ParquetFile(path).read_row_groups(row_groups, columns=["round", "agent", "content"])
+        messages = table.to_pylist()
+    else:
+        messages = []
+        for path in chunk[1]:
+            messages.extend(read_messages(path, columns=["round", "agent", "content"]))
+    return [m for m in messages if (m.get("agent") or "").startswith("Debater_") and m.get("content")]
+
+
+def analyze_chunk(chunk):
+    """
+    Partial result for one chunk: summed term counts per (round, agent), the
+    document frequency of every hashed feature, the number of debater messages
+    and a readable name for each hashed feature that occurred.
+    """
+    messages = _load_chunk(chunk)
+    if not messages:
+        return {"n_docs": 0, "doc_freq": None, "groups": {}, "names": {}}
+
+    vectorizer = _vectorizer()
+    texts = [_PREFIX.sub("", m["content"]) for m in messages]
+    counts = vectorizer.transform(texts).tocsr()
+
+    keys = [(int(m.get("round") or 0), m["agent"]) for m in messages]
+    unique_keys = sorted(set(keys))
+    code_of = {key: i for i, key in enumerate(unique_keys)}
+    codes = np.fromiter((code_of[key] for key in keys), dtype=np.int64, count=len(keys))
+    indicator = sp.csr_matrix(
+        (np.ones(len(codes)), (codes, np.arange(len(codes)))),
+        shape=(len(unique_keys), len(codes)),
+    )
+    group_counts = (indicator @ counts).tocsr()
+
+    # Hashing can't be inverted, so remember which token produced each feature.
+    # One name per feature caps this at N_FEATURES entries.
+    analyzer = vectorizer.build_analyzer()
+    tokens = sorted({token for text in texts for token in analyzer(text)})
+    names = {}
+    if tokens:
+        token_rows = vectorizer.transform(tokens).tocsr()
+        for token, start, end in zip(tokens, token_rows.indptr[:-1], token_rows.indptr[1:]):
+            for index in token_rows.indices[start:end]:
+                names.setdefault(int(index), token)
+
+    return {
+        "n_docs": counts.shape[0],
+        "doc_freq": sp.csr_matrix((counts > 0).sum(axis=0)),
+        "groups": {key: group_counts[i] for i, key in enumerate(unique_keys)},
+        "names": names,
+    }
+
+
+def merge(total, part):
+    if part["n_docs"] == 0:
+        return total
+    total["n_docs"] += part["n_docs"]
+    total["doc_freq"] = part["doc_freq"] if total["doc_freq"] is None else total["doc_freq"] + part["doc_freq"]
+    for key, row in part["groups"].items():
+        total["groups"][key] = row if key not in total["groups"] else total["groups"][key] + row
+    for index, name in part["names"].items():
+        total["names"].setdefault(index, name)
+    return total
+
+
+def _top_terms(counts, idf, names, top_n):
+    row = sp.csr_matrix(counts.multiply(idf))
+    norm = np.sqrt((row.data ** 2).sum()) or 1.0
+    order = np.argsort(-row.data, kind="stable")[:top_n]
+    return [
+        {"term": names.get(int(row.indices[i]), f"#{row.indices[i]}"), "score": round(float(row.data[i] / norm), 4)}
+        for i in order
+    ]
+
+
+def build_report(total, overall_n=15, debater_n=10, round_n=5):
+    """Overall, per-debater and per-round (per debater) keywords from the merged partials."""
+    if total["n_docs"] == 0:
+        return {"debaterMessages": 0, "overallKeywords": [], "keywordsByDebater": {}, "timeline": []}
+
+    doc_freq = total["doc_freq"].toarray().ravel()
+    idf = np.log((1 + total["n_docs"]) / (1 + doc_freq)) + 1
+    names = total["names"]
+    groups = total["groups"]
+
+    overall = sum(groups.values())
+    by_debater = {}
+    for (round_num, agent), row in groups.items():
+        by_debater[agent] = row if agent not in by_debater else by_debater[agent] + row
+
+    timeline = []
+    for round_num in sorted({round_num for round_num, _ in groups}):
+        timeline.append({
+            "round": round_num,
+            "keywordsByDebater": {
+                agent: _top_terms(row, idf, names, round_n)
+                for (r, agent), row in sorted(groups.items()) if r == round_num
+            },
+        })
+
+    return {
+        "debaterMessages": total["n_docs"],
+        "overallKeywords": _top_terms(overall, idf, names, overall_n),
+        "keywordsByDebater": {agent: _top_terms(row, idf, names, debater_n) for agent, row in sorted(by_debater.items())},
+        "timeline": timeline,
+    }
+
+
+def run_corpus_analysis(paths, workers=None):
+    """
+    Analyzes every transcript under `paths` with a pool of `workers` processes
+    (default: all cores). At most two chunks per worker are in flight, so
+    memory stays bounded however large the corpus is.
+    """
+    chunks = make_chunks(paths)
+    workers = workers or os.cpu_count() or 1
+    total = {"n_docs": 0, "doc_freq": None, "groups": {}, "names": {}}
+    print(f"Analyzing {len(chunks)} chunks with {workers} workers...")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        done = 0
+        for chunk in chunks:
+            pending.add(pool.submit(analyze_chunk, chunk))
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    total = merge(total, future.result())
+                    done += 1
+        for future in pending:
+            total = merge(total, future.result())
+            done += 1
+    print(f"Processed {done} chunks, {total['n_docs']} debater messages.")
+    return build_report(total)
+
+
+def print_report(report):
+    print("\n" + "="*50)
+    print("   TF-IDF Keywords: Entire Corpus")
+    print("="*50)
+    print(", ".join(k["term"] for k in report["overallKeywords"]))
+
+    print("\n" + "="*50)
+    print("   TF-IDF Keywords: Per Debater")
+    print("="*50)
+    for agent, keywords in report["keywordsByDebater"].items():
+        print(f"\nTop keywords for {agent}:")
+        print(", ".join(k["term"] for k in keywords))
+
+    print("\n" + "="*50)
+    print("   TF-IDF Keywords: Per Round")
+    print("="*50)
+    for entry in report["timeline"]:
+        print(f"\nRound {entry['round']}:")
+        for agent, keywords in entry["keywordsByDebater"].items():
+            print(f"  {agent}: " + ", ".join(k["term"] for k in keywords))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core keyword analysis over many debate transcripts.")
+    parser.add_argument("paths", nargs="+", help="JSONL/JSON transcripts, Parquet files or archive directories")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    print_report(run_corpus_analysis(args.paths, workers=args.workers))
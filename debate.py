@@ -1,44 +1,102 @@
 from dotenv import load_dotenv
 import os
+import sys
 import json
 import re
+import uuid
 from collections import Counter
-from autogen.agentchat import AssistantAgent, GroupChat, GroupChatManager, UserProxyAgent
+from concurrent.futures import ThreadPoolExecutor
+from autogen import OpenAIWrapper
+from autogen.agentchat import Agent, AssistantAgent, GroupChat, GroupChatManager, UserProxyAgent
+from transcript_store import TranscriptLog
+
+# Verdict parsing/aggregation is shared with the web backend's debate engine
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mad-app", "backend"))
+from verdicts import parse_round_winner, aggregate_votes
 
 # Load environment variables from .env file
 load_dotenv()
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not set in environment or .env file")
+DEFAULT_TOPIC = "AI will benefit society more than it will harm it."
+
+# Match format: "best_of" (stop once the majority can't change), "first_to"
+# (stop when a debater reaches WIN_TARGET round wins) or "fixed" (always NUM_ROUNDS)
+MATCH_MODE = "best_of"
+NUM_ROUNDS = 5
+WIN_TARGET = 3
+DEBATERS = ["Debater_A", "Debater_B"]
+
+
+class RoundScheduler:
+    """
+    Watches the group chat as it runs and tallies each Judge verdict the moment
+    it arrives. Used as the manager's is_termination_msg, so the chat stops as
+    soon as the match result is decided instead of playing out every round.
+    """
+
+    def __init__(self, mode=MATCH_MODE, num_rounds=NUM_ROUNDS, win_target=WIN_TARGET, debaters=DEBATERS, verbose=True):
+        if mode not in ("best_of", "first_to", "fixed"):
+            raise ValueError(f"Unknown match mode: {mode}")
+        self.mode = mode
+        self.num_rounds = num_rounds
+        self.win_target = win_target
+        self.wins = Counter({name: 0 for name in debaters})
+        self.round_winners = []
+        self.rounds_played = 0
+        self.verbose = verbose
+
+    def log(self, text):
+        if self.verbose:
+            print(text)
 
-llm_config = {"config_list": [{"model": "gpt-4o-mini", "api_key": api_key}]}
+    def record_verdict(self, content):
+        """Parses a Judge message and returns the round winner (or None)."""
+        self.rounds_played += 1
+        # Use regex to find "Round Winner: Debater_A" or "Round Winner: Debater_B"
+        match = re.search(r"Round Winner: (Debater_[AB])", content, re.IGNORECASE)
+        if not match:
+            self.log(f"Warning: Could not find a Round Winner for Round {self.rounds_played}.")
+            return None
+        winner_name = match.group(1).replace("_a", "_A").replace("_b", "_B")
+        self.round_winners.append(winner_name)
+        self.wins[winner_name] += 1
+        self.log(f"Round {self.rounds_played} Winner: {winner_name}")
+        return winner_name
 
-debater_a = AssistantAgent(
-    name="Debater_A",
-    system_message=(
+    def is_decided(self):
+        remaining = self.num_rounds - self.rounds_played
+        if remaining <= 0:
+            return True
+        if self.mode == "first_to":
+            return max(self.wins.values()) >= self.win_target
+        if self.mode == "best_of":
+            (_, leader), (_, runner_up) = self.wins.most_common(2)
+            return leader > runner_up + remaining
+        return False
+
+    def __call__(self, message):
+        if message.get("name") == "Judge":
+            self.record_verdict(message.get("content", "") or "")
+            if self.is_decided():
+                self.log(f"Match decided after {self.rounds_played} rounds.")
+                return True
+        return False
+
+# Default system prompts; run_debate() takes overrides per agent name
+DEFAULT_PROMPTS = {
+    "Debater_A": (
         "You are Debater_A. Your goal is to argue **FOR** the topic.\n"
         "**Style:** Be direct, confident, and conversational. Get straight to the point.\n"
         "**Rules:** Wait for the topic, then make your first argument. After that, you will refute your opponent and strengthen your case.\n"
         "Stay on topic. **Do not** talk about the debate's rules, your strategy, or the Judge."
     ),
-    llm_config=llm_config,
-)
-
-debater_b = AssistantAgent(
-    name="Debater_B",
-    system_message=(
+    "Debater_B": (
         "You are Debater_B. Your goal is to argue **AGAINST** the topic.\n"
         "**Style:** Be direct, confident, and conversational. Get straight to the point.\n"
         "**Rules:** Wait for your opponent's first argument, then begin your refutation.\n"
         "Stay on topic. **Do not** talk about the debate's rules, your strategy, or the Judge."
     ),
-    llm_config=llm_config,
-)
-
-judge = AssistantAgent(
-    name="Judge",
-    system_message=(
+    "Judge": (
         "You are a neutral debate judge.\n"
         "Your job is to provide a brief critique of the two arguments you just heard and declare a winner *for that round*.\n"
         "**Style:** Be direct, impartial, and concise. **Do not** use formal salutations.\n"
@@ -46,105 +104,254 @@ judge = AssistantAgent(
         "Round Winner: Debater_A\n"
         "Round Winner: Debater_B"
     ),
-    llm_config=llm_config,
-)
-
-# Create a UserProxyAgent to initiate the conversation
-user_proxy = UserProxyAgent(
-    name="User_Proxy",
-    human_input_mode="NEVER",
-    code_execution_config=False,
-)
-
-# Set up the group chat
-group_chat = GroupChat(
-    agents=[debater_a, debater_b, judge], 
-    messages=[], 
-    max_round=16, # 5 rounds * 3 speakers + 1 buffer
-    speaker_selection_method="round_robin"
-)
-
-# The manager runs the chat and no longer needs termination logic
-manager = GroupChatManager(
-    groupchat=group_chat, 
-    llm_config=llm_config
-)
-
-topic = "AI will benefit society more than it will harm it."
-
-# Initiate the chat
-user_proxy.initiate_chat(manager, message=topic)
-
-# === PARSE AND SAVE THE DEBATE HISTORY AS JSON ===
-
-messages = group_chat.messages
-if not messages:
-    raise RuntimeError("No messages found in group_chat.messages attribute")
-
-# The first message is the topic from the User_Proxy
-topic = messages[0].get("content", "Unknown Topic").strip()
-
-# The actual debate messages start from the second message
-debate_messages = messages[1:]
-
-structured_messages = []
-round_num = 1
-round_winners = []
-
-print("\n--- Parsing Debate History ---")
-
-for msg in debate_messages:
-    agent_name = msg.get("name", "unknown")
-    content = msg.get("content", "").strip()
-    
-    if content:
-        # Add message to the structured list
-        structured_messages.append({
-            "round": round_num,
-            "agent": agent_name,
-            "content": content
-        })
+}
+
+
+def make_judge_panel(panel, llm_config, aggregation="majority", before_llm_call=None, record=None):
+    """
+    A reply function that has every panel member judge the round at the same
+    time and answers with the combined verdict, ending in the usual
+    "Round Winner:" line so RoundScheduler reads it like a single judge's.
+    Each member is {"system_message", "model" (optional), "weight" (optional)}.
+    `record` receives {"votes", "winner", "agreement"} for every round.
+    """
+    base = llm_config["config_list"][0]
+    clients = [OpenAIWrapper(config_list=[{**base, "model": member.get("model") or base["model"]}]) for member in panel]
+
+    def ask(i, messages):
+        if before_llm_call is not None:
+            before_llm_call()
+        member = panel[i]
+        response = clients[i].create(
+            messages=[{"role": "system", "content": member["system_message"]}, *messages],
+            cache_seed=None,
+        )
+        content = clients[i].extract_text_or_completion_object(response)[0] or ""
+        return {
+            "judge": i,
+            "model": member.get("model") or base["model"],
+            "weight": member.get("weight", 1.0),
+            "winner": parse_round_winner(content or "", DEBATERS),
+            "content": content,
+        }
+
+    def reply(recipient, messages=None, sender=None, config=None):
+        with ThreadPoolExecutor(max_workers=len(panel)) as pool:
+            votes = list(pool.map(lambda i: ask(i, messages or []), range(len(panel))))
+        winner, agreement = aggregate_votes(votes, aggregation)
+        if record is not None:
+            record({
+                "votes": [{k: v[k] for k in ("judge", "model", "weight", "winner")} for v in votes],
+                "winner": winner,
+                "agreement": round(agreement, 3),
+            })
+        lines = [f"Panel of {len(votes)} judges ({aggregation}), agreement {agreement:.0%}:"]
+        lines += [f"- Judge {v['judge'] + 1} ({v['model']}): {v['winner'] or 'no verdict'}" for v in votes]
+        reasoning = next((v["content"] for v in votes if v["winner"] == winner), votes[0]["content"])
+        reasoning = re.sub(r"[\s*_]*Round Winner:.*$", "", reasoning, flags=re.IGNORECASE | re.DOTALL).strip()
+        return True, "\n".join(lines) + f"\n\n{reasoning}\n\nRound Winner: {winner or 'None'}"
+
+    return reply
+
+
+def get_llm_config():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not set in environment or .env file")
+    config = {"model": "gpt-4o-mini", "api_key": api_key}
+    if os.getenv("OPENAI_BASE_URL"):  # e.g. the benchmark stub server
+        config["base_url"] = os.getenv("OPENAI_BASE_URL")
+    return {"config_list": [config]}
+
+
+def run_debate(
+    topic=DEFAULT_TOPIC,
+    prompts=None,
+    output_path="debate_history.json",
+    transcript_path=None,
+    mode=MATCH_MODE,
+    num_rounds=NUM_ROUNDS,
+    win_target=WIN_TARGET,
+    before_llm_call=None,
+    metadata=None,
+    judge_panel=None,
+    panel_aggregation="majority",
+    results_db=None,
+    verbose=True,
+):
+    """
+    Runs one debate and saves it as JSON to output_path (skipped if None).
+    Every message is also appended to a JSONL log the moment it is produced,
+    at transcript_path (default: output_path with a .jsonl extension), so a
+    crash mid-run keeps everything said so far. `prompts` overrides system
+    messages by agent name. `before_llm_call` is called right before every
+    agent's model call; the batch runner uses it for rate limiting. `metadata`
+    is merged into the saved record.
+
+    With `judge_panel` (a list of {"system_message", "model", "weight"}; missing
+    system messages default to the Judge prompt) every round is decided by
+    all panel members in parallel and aggregated by `panel_aggregation`
+    ("majority" or "weighted"). Each round's votes and agreement are saved
+    under "panel_verdicts".
+
+    With `results_db` (a results_db.ResultsDB) each verdict is written to the
+    results database, and the leaderboard updated, as soon as it is parsed.
+    The debate is keyed by metadata["run_id"] when given.
+    """
+    llm_config = get_llm_config()
+    prompts = {**DEFAULT_PROMPTS, **(prompts or {})}
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    debater_a, debater_b, judge = (
+        AssistantAgent(name=name, system_message=prompts[name], llm_config=llm_config)
+        for name in ("Debater_A", "Debater_B", "Judge")
+    )
+
+    if before_llm_call is not None:
+        def throttle(recipient, messages=None, sender=None, config=None):
+            before_llm_call()
+            return False, None  # fall through to the normal LLM reply
+
+        # A panel throttles each of its own calls instead
+        for agent in (debater_a, debater_b) if judge_panel else (debater_a, debater_b, judge):
+            agent.register_reply([Agent, None], throttle, position=0)
+
+    panel_verdicts = []
+    if judge_panel:
+        panel = [{**member, "system_message": member.get("system_message") or prompts["Judge"]} for member in judge_panel]
+        judge.register_reply(
+            [Agent, None],
+            make_judge_panel(panel, llm_config, panel_aggregation, before_llm_call, record=panel_verdicts.append),
+            position=0,
+        )
+
+    # Create a UserProxyAgent to initiate the conversation
+    user_proxy = UserProxyAgent(
+        name="User_Proxy",
+        human_input_mode="NEVER",
+        code_execution_config=False,
+    )
+
+    # Set up the group chat
+    group_chat = GroupChat(
+        agents=[debater_a, debater_b, judge], 
+        messages=[], 
+        max_round=num_rounds * 3 + 1, # rounds * 3 speakers + 1 buffer
+        speaker_selection_method="round_robin"
+    )
+
+    # The scheduler ends the chat early once the match winner can't change.
+    # Round-robin never asks the manager's LLM to pick a speaker, so it gets none.
+    scheduler = RoundScheduler(mode=mode, num_rounds=num_rounds, win_target=win_target, verbose=verbose)
+
+    if transcript_path is None and output_path:
+        transcript_path = os.path.splitext(output_path)[0] + ".jsonl"
+    transcript = None
+    if transcript_path:
+        transcript = TranscriptLog(transcript_path, debate_id=(metadata or {}).get("run_id"), topic=topic)
+
+    debate_id = (metadata or {}).get("run_id") or uuid.uuid4().hex
+    if results_db is not None:
+        results_db.start_debate(debate_id, topic, prompts, DEBATERS, variant=(metadata or {}).get("variant"))
+
+    def on_message(message):
+        # Sees every message as it is added to the chat: log it, then let the scheduler decide
+        content = (message.get("content") or "").strip()
+        if transcript is not None and content and message.get("name") in prompts:
+            transcript.append(scheduler.rounds_played + 1, message["name"], content)
+        verdicts_before = len(scheduler.round_winners)
+        decided = scheduler(message)
+        if results_db is not None and message.get("name") == "Judge":
+            winner = scheduler.round_winners[-1] if len(scheduler.round_winners) > verdicts_before else None
+            results_db.record_verdict(debate_id, scheduler.rounds_played, winner)
+        return decided
+
+    manager = GroupChatManager(
+        groupchat=group_chat, 
+        llm_config=False,
+        is_termination_msg=on_message,
+    )
+
+    # Initiate the chat
+    # verbose=False only quiets our own logging and the opening message: the
+    # pinned autogen (0.2.20) has no switch for the manager's per-turn output
+    user_proxy.initiate_chat(manager, message=topic, silent=not verbose)
+
+    # === PARSE AND SAVE THE DEBATE HISTORY AS JSON ===
+
+    messages = group_chat.messages
+    if not messages:
+        raise RuntimeError("No messages found in group_chat.messages attribute")
+
+    # The first message is the topic from the User_Proxy
+    topic = messages[0].get("content", "Unknown Topic").strip()
+
+    # The actual debate messages start from the second message
+    debate_messages = messages[1:]
+
+    structured_messages = []
+    round_num = 1
+    # Verdicts were already parsed live by the scheduler
+    round_winners = scheduler.round_winners
+
+    log("\n--- Parsing Debate History ---")
+
+    for msg in debate_messages:
+        agent_name = msg.get("name", "unknown")
+        content = msg.get("content", "").strip()
         
-        # If this is the Judge, find the round winner
-        if agent_name == "Judge":
-            print(f"Parsing Judge's critique for Round {round_num}...")
-            # Use regex to find "Round Winner: Debater_A" or "Round Winner: Debater_B"
-            match = re.search(r"Round Winner: (Debater_[AB])", content, re.IGNORECASE)
-            
-            if match:
-                winner_name = match.group(1).replace("_a", "_A").replace("_b", "_B")
-                round_winners.append(winner_name)
-                print(f"Round {round_num} Winner: {winner_name}")
-            else:
-                print(f"Warning: Could not find a Round Winner for Round {round_num}.")
+        if content:
+            # Add message to the structured list
+            structured_messages.append({
+                "round": round_num,
+                "agent": agent_name,
+                "content": content
+            })
             
-            # Increment round number
-            round_num += 1
-
-# Tally the winners
-overall_winner = "Tie"
-if round_winners:
-    winner_counts = Counter(round_winners)
-    # Check for a tie
-    if len(winner_counts) > 1 and winner_counts.most_common(2)[0][1] == winner_counts.most_common(2)[1][1]:
-        overall_winner = "Tie"
-    else:
-        overall_winner = winner_counts.most_common(1)[0][0]
-
-print(f"\nOverall Winner: {overall_winner}")
-
-# Create the final data object
-output_data = {
-    "topic": topic,
-    "winner": overall_winner,
-    "round_victories": dict(Counter(round_winners)), # Shows the score, e.g., {"Debater_A": 3, "Debater_B": 2}
-    "message_count": len(structured_messages),
-    "messages": structured_messages
-}
+            # The Judge closes each round
+            if agent_name == "Judge":
+                round_num += 1
+
+    # Tally the winners
+    overall_winner = "Tie"
+    if round_winners:
+        winner_counts = Counter(round_winners)
+        # Check for a tie
+        if len(winner_counts) > 1 and winner_counts.most_common(2)[0][1] == winner_counts.most_common(2)[1][1]:
+            overall_winner = "Tie"
+        else:
+            overall_winner = winner_counts.most_common(1)[0][0]
+
+    log(f"\nOverall Winner: {overall_winner}")
+    if results_db is not None:
+        results_db.finish_debate(debate_id, overall_winner, scheduler.rounds_played)
+
+    # Create the final data object
+    output_data = {
+        "topic": topic,
+        "winner": overall_winner,
+        "round_victories": dict(Counter(round_winners)), # Shows the score, e.g., {"Debater_A": 3, "Debater_B": 2}
+        "match_mode": scheduler.mode,
+        "rounds_played": scheduler.rounds_played,
+        **({"panel_verdicts": panel_verdicts} if judge_panel else {}),
+        **(metadata or {}),
+        "message_count": len(structured_messages),
+        "messages": structured_messages
+    }
+
+    # Write the data to a JSON file (via a temp file so a crash never leaves half a record)
+    if output_path:
+        log("\n--- SAVING DEBATE HISTORY (JSON) ---")
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, output_path)
+        log(f"Debate saved to {output_path}")
+    if transcript is not None:
+        log(f"Transcript log: {transcript.path}")
+
+    return output_data
 
-# Write the data to a JSON file
-print("\n--- SAVING DEBATE HISTORY (JSON) ---")
-with open("debate_history.json", "w", encoding="utf-8") as f:
-    json.dump(output_data, f, indent=2, ensure_ascii=False)
 
-print("Debate saved to debate_history.json")
\ No newline at end of file
+if __name__ == "__main__":
+    run_debate()
@@ -0,0 +1,119 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+CACHE_DIR = ".embedding_cache"
+
+_models = {}
+_model_lock = threading.Lock()
+
+
+def get_embedding_model(model_name=MODEL_NAME):
+    """Process-wide SentenceTransformer, loaded once per model name."""
+    if model_name not in _models:
+        with _model_lock:
+            if model_name not in _models:
+                from sentence_transformers import SentenceTransformer
+                _models[model_name] = SentenceTransformer(model_name)
+    return _models[model_name]
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of sentence embeddings, one directory per model:
+      vectors.f32 - float32 matrix, one row per text, read through a memory map
+      keys.txt    - SHA-256 of each row's text, in row order
+      meta.json   - model name and embedding dimension
+    Rows are only ever appended, and a key is written after its vector, so a
+    crash mid-write leaves at most a tail of orphaned rows that is trimmed on
+    load. meta.json is written last, so a cache without it is treated as empty.
+    """
+
+    def __init__(self, directory=CACHE_DIR, model_name=MODEL_NAME):
+        self.model_name = model_name
+        self.directory = os.path.join(directory, model_name.replace("/", "_"))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.keys_path = os.path.join(self.directory, "keys.txt")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self._lock = threading.Lock()
+        self.dim = None
+        self.index = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return  # nothing was ever fully written; _append starts the files over
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            dim = json.load(f)["dim"]
+        lines = []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        keys = [line[:-1] for line in lines if line.endswith("\n")]
+        vector_bytes = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        # Only rows with both a vector and a complete key line count; trim whatever a crash left beyond that
+        rows = min(len(keys), vector_bytes // (dim * 4))
+        if rows < len(lines) or not os.path.exists(self.keys_path):
+            with open(self.keys_path, "w", encoding="utf-8") as f:
+                f.writelines(key + "\n" for key in keys[:rows])
+        if vector_bytes != rows * dim * 4:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(rows * dim * 4)
+        self.dim = dim
+        self.index = {key: row for row, key in enumerate(keys[:rows])}
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _matrix(self):
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.index), self.dim))
+
+    def _append(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        first = self.dim is None
+        if first:
+            self.dim = vectors.shape[1]
+            os.makedirs(self.directory, exist_ok=True)
+        # The first write truncates anything a crash before meta.json left behind
+        with open(self.vectors_path, "wb" if first else "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.keys_path, "w" if first else "a", encoding="utf-8") as f:
+            for key in keys:
+                self.index[key] = len(self.index)
+                f.write(key + "\n")
+        if first:
+            # Written last, and atomically: its presence means the files above are usable
+            tmp_path = self.meta_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+            os.replace(tmp_path, self.meta_path)
+
+    def encode(self, texts, batch_size=64, show_progress_bar=False):
+        """
+        Embeddings for `texts` in order. Only texts not seen before (by content
+        hash) are sent to the model, in batches; everything else is read from disk.
+        """
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self.index and key not in missing:
+                    missing[key] = text
+
+            if missing:
+                vectors = get_embedding_model(self.model_name).encode(
+                    list(missing.values()),
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=show_progress_bar,
+                )
+                self._append(list(missing.keys()), vectors)
+
+            if not keys:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            rows = np.fromiter((self.index[key] for key in keys), dtype=np.int64, count=len(keys))
+            return np.asarray(self._matrix()[rows])
@@ -0,0 +1,105 @@
+"""
+Compares the native DebateEngine with the GroupChat/GroupChatManager path it
+replaced, on per-turn latency and prompt tokens sent.
+
+    python bench_engine.py --rounds 5
+
+Both paths make real model calls with OPENAI_API_KEY (or whatever server
+OPENAI_BASE_URL points at).
+"""
+import os
+import time
+import argparse
+import statistics
+from typing import List, Dict
+from dotenv import load_dotenv
+from autogen.agentchat import AssistantAgent, GroupChat, GroupChatManager, UserProxyAgent
+
+from debate_engine import DebateEngine, MODEL
+
+load_dotenv()
+
+LLM_CONFIG = {
+    "config_list": [{
+        "model": MODEL,
+        "api_key": os.getenv("OPENAI_API_KEY"),
+        **({"base_url": os.getenv("OPENAI_BASE_URL")} if os.getenv("OPENAI_BASE_URL") else {}),
+    }],
+    "cache_seed": None
+}
+
+AGENTS = [
+    {"name": "Debater_A", "systemMessage": "You are Debater_A. Argue FOR the topic. Be direct and concise."},
+    {"name": "Debater_B", "systemMessage": "You are Debater_B. Argue AGAINST the topic. Be direct and concise."},
+    {"name": "Judge", "systemMessage": (
+        "You are a neutral debate judge. Briefly critique the round and end with exactly one of:\n"
+        "Round Winner: Debater_A\nRound Winner: Debater_B"
+    )},
+]
+
+def run_native(topic: str, rounds: int) -> Dict:
+    engine = DebateEngine(topic, AGENTS)
+    transcript = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        engine.run_round(transcript)
+    return {
+        "wall": time.perf_counter() - started,
+        "turn_seconds": [t["seconds"] for t in engine.turn_stats],
+        "prompt_tokens": sum(t["prompt_tokens"] or 0 for t in engine.turn_stats),
+    }
+
+def run_groupchat(topic: str, rounds: int) -> Dict:
+    """The previous debate_logic path: manager with an LLM, max_round bumps and moderator filler."""
+    agents = [AssistantAgent(name=a["name"], system_message=a["systemMessage"], llm_config=LLM_CONFIG) for a in AGENTS]
+    user_proxy = UserProxyAgent(name="Moderator", human_input_mode="NEVER", code_execution_config=False)
+    group_chat = GroupChat(
+        agents=[user_proxy, *agents], messages=[], max_round=4, speaker_selection_method="round_robin"
+    )
+
+    stamps: List[float] = []
+    def observe(message: Dict) -> bool:
+        stamps.append(time.perf_counter())
+        return False
+
+    manager = GroupChatManager(groupchat=group_chat, llm_config=LLM_CONFIG, is_termination_msg=observe)
+
+    started = time.perf_counter()
+    user_proxy.initiate_chat(manager, message=f"Debate Topic: {topic}")
+    for _ in range(rounds - 1):
+        group_chat.max_round += 4
+        user_proxy.initiate_chat(
+            manager, message="Moderator: Proceed to the next round of arguments.", clear_history=False
+        )
+
+    prompt_tokens = 0
+    for agent in agents:
+        summary = agent.client.total_usage_summary or {}
+        prompt_tokens += sum(v.get("prompt_tokens", 0) for k, v in summary.items() if k != "total_cost")
+
+    # Time between consecutive appends approximates each agent turn
+    turn_seconds = [b - a for a, b in zip(stamps, stamps[1:]) if b - a > 0.05]
+    return {
+        "wall": time.perf_counter() - started,
+        "turn_seconds": turn_seconds,
+        "prompt_tokens": prompt_tokens,
+    }
+
+def report(name: str, result: Dict) -> None:
+    turns = len(result["turn_seconds"]) or 1
+    print(f"\n{name}")
+    print(f"  turns:               {len(result['turn_seconds'])}")
+    print(f"  wall time:           {result['wall']:.2f}s")
+    print(f"  p50 turn latency:    {statistics.median(result['turn_seconds'] or [0]):.2f}s")
+    print(f"  mean turn latency:   {statistics.mean(result['turn_seconds'] or [0]):.2f}s")
+    print(f"  prompt tokens total: {result['prompt_tokens']}")
+    print(f"  prompt tokens/turn:  {result['prompt_tokens'] / turns:.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topic", default="AI will benefit society more than it will harm it.")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    report("DebateEngine (native)", run_native(args.topic, args.rounds))
+    report("GroupChat + GroupChatManager", run_groupchat(args.topic, args.rounds))
@@ -0,0 +1,203 @@
+"""
+Load-tests the backend against the stub OpenAI server, so the numbers reflect
+our own FastAPI / engine / analysis overhead and not the model.
+
+    python bench_load.py --concurrency 1 4 16 64 --requests 64 --latency 0.3 --tokens-per-sec 80
+
+Starts stub_openai.py and the backend (uvicorn main:app) as subprocesses. The
+backend gets OPENAI_BASE_URL pointing at the stub and LLM_CACHE_MODE=passthrough.
+Then, at each concurrency level, it fires --requests calls at each of
+/api/start-debate, /api/continue-debate, /api/analyze-debate and
+/api/analyze-taxonomy, and reports p50/p99 latency and requests/sec. The
+analysis payloads differ per request, so they measure the computation and not
+the result cache. 429s from the job queue are counted separately from errors.
+Taxonomy requests skip the local MAST pre-filter, as the API does by default;
+--prefilter turns it on. Pass --backend-url to test a server that's already
+running (it must be pointed at a stub itself).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Callable, Awaitable
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+AGENTS = [
+    {"name": "Debater_A", "systemMessage": "You are Debater_A. Argue FOR the topic. Be direct and concise."},
+    {"name": "Debater_B", "systemMessage": "You are Debater_B. Argue AGAINST the topic. Be direct and concise."},
+    {"name": "Judge", "systemMessage": (
+        "You are a neutral debate judge. Briefly critique the round and end with exactly one of:\n"
+        "Round Winner: Debater_A\nRound Winner: Debater_B"
+    )},
+]
+TOPIC = "AI will benefit society more than it will harm it."
+
+def sample_round(round_num: int) -> List[Dict]:
+    return [
+        {"round": round_num, "agent": "Debater_A", "content": f"Round {round_num}: automation raises productivity and frees people for creative work."},
+        {"round": round_num, "agent": "Debater_B", "content": f"Round {round_num}: automation concentrates wealth and erodes privacy through surveillance."},
+        {"round": round_num, "agent": "Judge", "content": "Both made fair points. Round Winner: Debater_A"},
+    ]
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def wait_until_up(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def start_servers(args) -> List[subprocess.Popen]:
+    stub = subprocess.Popen(
+        [sys.executable, "stub_openai.py", "--port", str(args.stub_port), "--latency", str(args.latency),
+         "--tokens-per-sec", str(args.tokens_per_sec), "--completion-tokens", str(args.completion_tokens)],
+        cwd=BACKEND_DIR,
+    )
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.stub_port}/v1",
+        "OPENAI_API_KEY": "stub",
+        "LLM_CACHE_MODE": "passthrough",
+    }
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    processes = [stub, backend]
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.stub_port}/docs")
+        wait_until_up(f"http://127.0.0.1:{args.port}/metrics")
+    except Exception:
+        stop_servers(processes)
+        raise
+    return processes
+
+def stop_servers(processes: List[subprocess.Popen]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def load(
+    client: httpx.AsyncClient,
+    concurrency: int,
+    n_requests: int,
+    request: Callable[[int], Awaitable[httpx.Response]],
+) -> Dict:
+    """Runs n_requests calls with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    counts = {"ok": 0, "rejected": 0, "errors": 0}
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await request(i)
+            except httpx.HTTPError:
+                counts["errors"] += 1
+                return
+            if response.status_code == 429:
+                counts["rejected"] += 1
+            elif response.is_success:
+                counts["ok"] += 1
+                latencies.append(time.perf_counter() - started)
+            else:
+                counts["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        **counts,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "rps": counts["ok"] / elapsed if elapsed else float("nan"),
+    }
+
+async def run_benchmark(base_url: str, levels: List[int], n_requests: int, prefilter: bool) -> List[Dict]:
+    results = []
+    timeout = httpx.Timeout(600)
+    limits = httpx.Limits(max_connections=max(levels) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start_body = {"topic": TOPIC, "agents_config": AGENTS}
+
+        def transcript(first_round: int) -> List[Dict]:
+            return [m for r in range(first_round, first_round + 3) for m in sample_round(r)]
+
+        for concurrency in levels:
+            # Sessions for continue-debate are created outside the timed window
+            sessions: List[str] = []
+            while len(sessions) < n_requests:
+                batch = await asyncio.gather(*(
+                    client.post("/api/start-debate", json=start_body)
+                    for _ in range(min(concurrency, n_requests - len(sessions)))
+                ))
+                sessions += [r.json()["session_id"] for r in batch if r.is_success]
+
+            endpoints = {
+                "/api/start-debate": lambda i: client.post("/api/start-debate", json=start_body),
+                "/api/continue-debate": lambda i: client.post("/api/continue-debate", json={"session_id": sessions[i]}),
+                # Distinct rounds on both analysis endpoints, so the result caches
+                # don't turn this into a cache benchmark
+                "/api/analyze-debate": lambda i: client.post("/api/analyze-debate", json={
+                    "messages": transcript(3 * (1000 * concurrency + i)),
+                }),
+                "/api/analyze-taxonomy": lambda i: client.post("/api/analyze-taxonomy", json={
+                    "messages": sample_round(1000 * concurrency + i), "topic": TOPIC, "prefilter": prefilter,
+                }),
+            }
+            for path, request in endpoints.items():
+                stats = await load(client, concurrency, n_requests, request)
+                results.append({"endpoint": path, "concurrency": concurrency, "requests": n_requests, **stats})
+                print(
+                    f"{path:<24} c={concurrency:<4} p50={stats['p50'] * 1000:8.1f}ms p99={stats['p99'] * 1000:8.1f}ms "
+                    f"rps={stats['rps']:7.2f} ok={stats['ok']} 429={stats['rejected']} err={stats['errors']}"
+                )
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="requests per endpoint per concurrency level")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-sec", type=float, default=80)
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--prefilter", action="store_true", help="score taxonomy rounds locally first (off by default, like the API)")
+    parser.add_argument("--backend-url", help="benchmark an already running backend instead of starting one")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    processes: Optional[List[subprocess.Popen]] = None
+    if not args.backend_url:
+        processes = start_servers(args)
+    try:
+        base_url = args.backend_url or f"http://127.0.0.1:{args.port}"
+        results = asyncio.run(run_benchmark(base_url, args.concurrency, args.requests, args.prefilter))
+    finally:
+        if processes:
+            stop_servers(processes)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
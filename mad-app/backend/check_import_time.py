@@ -0,0 +1,41 @@
+"""
+Measures how long a fresh interpreter takes to import the backend app and
+fails if it exceeds the budget, so heavy imports don't creep back into
+module scope.
+
+    python check_import_time.py --budget 1.5
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def measure(runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", SNIPPET], capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=1.5, help="max median import time in seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"import main: median {median:.3f}s over {args.runs} runs (budget {args.budget:.3f}s)")
+    for heavy in ("pandas", "sklearn", "bertopic", "sentence_transformers", "openai"):
+        check = subprocess.run(
+            [sys.executable, "-c", f"import sys, main; print({heavy!r} in sys.modules)"],
+            capture_output=True, text=True, check=True, cwd=BACKEND_DIR,
+        )
+        print(f"  {heavy:<22} loaded at import: {check.stdout.strip()}")
+    sys.exit(0 if median <= args.budget else 1)
@@ -0,0 +1,289 @@
+import re
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Callable, Optional
+from llm_cache import chat_completion
+from metrics import timed
+from verdicts import parse_round_winner, aggregate_votes
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from job_queue import CancelToken
+
+MODEL = "gpt-4o-mini"
+
+# How much of the transcript an agent is sent each turn. Agents can override it
+# with a "contextPolicy" entry in their config:
+#   mode: "full"    -> every message so far
+#         "last_k"  -> only the last `window` completed rounds plus the current one
+#         "summary" -> like last_k, with older rounds folded into a rolling summary
+#   maxPromptTokens: hard cap; the oldest verbatim messages are dropped to fit
+DEFAULT_CONTEXT_POLICY = {"mode": "full", "window": 2, "maxPromptTokens": None}
+
+SUMMARY_PROMPT = (
+    "You keep a running summary of a debate. Merge the new rounds into the existing summary. "
+    "Keep each debater's main claims and rebuttals and every round's winner. "
+    "Be terse: no more than 200 words."
+)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(messages: List[Dict]) -> int:
+    """Approximate chat prompt size; falls back to ~4 chars/token without tiktoken."""
+    enc = _encoding()
+    total = 3  # every reply is primed with <|start|>assistant<|message|>
+    for msg in messages:
+        content = msg.get("content") or ""
+        total += 3 + (len(enc.encode(content)) if enc else len(content) // 4)
+        if "name" in msg:
+            total += 1
+    return total
+
+class DebateEngine:
+    """
+    Runs the fixed Debater_A -> Debater_B -> ... -> Judge cycle by calling the
+    model directly. Replaces GroupChat/GroupChatManager for the live app: the
+    speaking order never changes, so there is no speaker selection to do and no
+    moderator messages to inject between rounds.
+
+    The transcript is the same list of {"round", "agent", "content"} dicts the
+    API returns, so a session only has to store that list.
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        agents_config: List[Dict],
+        model: str = MODEL,
+        llm_client: Optional["OpenAI"] = None,
+        summary: Optional[Dict] = None,
+    ):
+        self.topic = topic
+        self.model = model
+        self.client = llm_client  # None -> the shared client from llm_cache
+        self.debaters = [a for a in agents_config if a["name"].startswith("Debater_")]
+        self.judge = next((a for a in agents_config if a["name"] == "Judge"), None)
+        if not self.debaters or self.judge is None:
+            raise ValueError("A debate needs at least one Debater_ agent and a Judge.")
+        # Rolling summary of the rounds that fell out of a "summary" agent's window.
+        # Callers persist it alongside the transcript so it is only ever extended.
+        self.summary = summary or {"through_round": 0, "content": ""}
+        # One entry per model call: agent, round, seconds, prompt/completion tokens
+        self.turn_stats: List[Dict] = []
+
+    @property
+    def turn_order(self) -> List[Dict]:
+        return [*self.debaters, self.judge]
+
+    @staticmethod
+    def context_policy(agent: Dict) -> Dict:
+        return {**DEFAULT_CONTEXT_POLICY, **(agent.get("contextPolicy") or {})}
+
+    def build_prompt(self, agent: Dict, transcript: List[Dict], round_num: Optional[int] = None) -> List[Dict]:
+        """
+        The agent sees its own turns as assistant messages and everyone else's as
+        user messages, trimmed to the agent's context policy and token cap.
+        """
+        policy = self.context_policy(agent)
+        if round_num is None:
+            round_num = transcript[-1]["round"] if transcript else 1
+
+        head = [
+            {"role": "system", "content": agent["systemMessage"]},
+            {"role": "user", "content": f"Debate Topic: {self.topic}"},
+        ]
+
+        visible = transcript
+        if policy["mode"] in ("last_k", "summary"):
+            first_round = round_num - policy["window"]
+            visible = [m for m in transcript if m["round"] >= first_round]
+            if policy["mode"] == "summary" and self.summary["content"] and first_round > 1:
+                head.append({
+                    "role": "user",
+                    "content": f"Summary of rounds 1-{self.summary['through_round']}:\n{self.summary['content']}",
+                })
+
+        body = []
+        for msg in visible:
+            if msg["agent"] == agent["name"]:
+                body.append({"role": "assistant", "content": msg["content"]})
+            else:
+                body.append({"role": "user", "name": msg["agent"], "content": msg["content"]})
+
+        # Drop the oldest verbatim messages until the prompt fits, keeping the latest one
+        cap = policy.get("maxPromptTokens")
+        if cap:
+            while len(body) > 1 and count_tokens(head + body) > cap:
+                body.pop(0)
+
+        return head + body
+
+    def update_summary(self, transcript: List[Dict], round_num: int) -> None:
+        """
+        Folds every round that has left the narrowest "summary" window into the
+        rolling summary, so no summary agent has a gap between summary and
+        window. Each round is summarized once, so the cost per round stays flat
+        no matter how long the debate runs.
+        """
+        windows = [self.context_policy(a)["window"] for a in self.turn_order if self.context_policy(a)["mode"] == "summary"]
+        if not windows:
+            return
+        through_round = round_num - min(windows) - 1
+        if through_round <= self.summary["through_round"]:
+            return
+
+        new_rounds = [m for m in transcript if self.summary["through_round"] < m["round"] <= through_round]
+        text = "\n\n".join(f"[Round {m['round']}] {m['agent']}: {m['content']}" for m in new_rounds)
+        started = time.perf_counter()
+        response = chat_completion(
+            client=self.client,
+            stage="summary",
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Topic: {self.topic}\n\nExisting summary:\n{self.summary['content'] or '(none)'}\n\nNew rounds:\n{text}"},
+            ],
+            max_tokens=400,
+        )
+        usage = response.usage
+        self.turn_stats.append({
+            "agent": "Summarizer",
+            "round": round_num,
+            "seconds": time.perf_counter() - started,
+            "prompt_tokens": usage.prompt_tokens if usage else None,
+            "completion_tokens": usage.completion_tokens if usage else None,
+            "cached": getattr(response, "cached", False),
+        })
+        self.summary = {"through_round": through_round, "content": (response.choices[0].message.content or "").strip()}
+
+    def _complete(
+        self,
+        agent: Dict,
+        transcript: List[Dict],
+        round_num: int,
+        model: Optional[str] = None,
+        label: Optional[str] = None,
+        on_delta: Optional[Callable[[Dict], None]] = None,
+    ) -> str:
+        """One model call for `agent`, recorded in turn_stats under `label` (default: the agent's name)."""
+        prompt = self.build_prompt(agent, transcript, round_num)
+        model = model or self.model
+        started = time.perf_counter()
+
+        forward = None
+        if on_delta is not None:
+            forward = lambda delta: on_delta({"round": round_num, "agent": agent["name"], "delta": delta})
+        stage = "judge" if agent["name"] == self.judge["name"] else "debater"
+        response = chat_completion(client=self.client, on_delta=forward, stage=stage, model=model, messages=prompt)
+        content = response.choices[0].message.content or ""
+        usage = response.usage
+
+        self.turn_stats.append({
+            "agent": label or agent["name"],
+            "round": round_num,
+            "model": model,
+            "seconds": time.perf_counter() - started,
+            "prompt_tokens": usage.prompt_tokens if usage else None,
+            "completion_tokens": usage.completion_tokens if usage else None,
+            "prompt_tokens_estimate": count_tokens(prompt),
+            "cached": getattr(response, "cached", False),
+        })
+        return content.strip()
+
+    def run_turn(
+        self,
+        agent: Dict,
+        transcript: List[Dict],
+        round_num: int,
+        on_delta: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        if agent is self.judge and agent.get("panel"):
+            return self.run_panel(transcript, round_num, on_delta=on_delta)
+        content = self._complete(agent, transcript, round_num, on_delta=on_delta)
+        return {"round": round_num, "agent": agent["name"], "content": content}
+
+    def run_panel(
+        self,
+        transcript: List[Dict],
+        round_num: int,
+        on_delta: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """
+        Judges the round with every member of the Judge's "panel" at once, so
+        the round takes about as long as its slowest judge rather than the sum.
+        The verdicts are combined by aggregate_votes(). The message ends with
+        the usual "Round Winner:" line and carries the votes under "panel".
+        """
+        judge = self.judge
+        members = judge["panel"]
+        method = judge.get("aggregation") or "majority"
+        names = [d["name"] for d in self.debaters]
+
+        def ask(i: int, member: Dict) -> Dict:
+            panelist = {**judge, "systemMessage": member.get("systemMessage") or judge["systemMessage"]}
+            content = self._complete(panelist, transcript, round_num, model=member.get("model"), label=f"Judge[{i}]")
+            return {
+                "judge": i,
+                "model": member.get("model") or self.model,
+                "weight": member.get("weight", 1.0),
+                "winner": parse_round_winner(content, names),
+                "content": content,
+            }
+
+        with ThreadPoolExecutor(max_workers=len(members)) as pool:
+            votes = list(pool.map(lambda item: ask(*item), enumerate(members)))
+
+        winner, agreement = aggregate_votes(votes, method)
+        lines = [f"Panel of {len(votes)} judges ({method}), agreement {agreement:.0%}:"]
+        lines += [f"- Judge {v['judge'] + 1} ({v['model']}): {v['winner'] or 'no verdict'}" for v in votes]
+        # Quote the reasoning of a judge who backed the panel's decision
+        reasoning = next((v["content"] for v in votes if v["winner"] == winner), votes[0]["content"])
+        reasoning = re.sub(r"[\s*_]*Round Winner:.*$", "", reasoning, flags=re.IGNORECASE | re.DOTALL).strip()
+        content = "\n".join(lines) + f"\n\n{reasoning}\n\nRound Winner: {winner or 'None'}"
+        if on_delta is not None:
+            on_delta({"round": round_num, "agent": judge["name"], "delta": content})
+
+        return {
+            "round": round_num,
+            "agent": judge["name"],
+            "content": content,
+            "panel": {
+                "aggregation": method,
+                "winner": winner,
+                "agreement": round(agreement, 3),
+                "votes": [{k: v[k] for k in ("judge", "model", "weight", "winner")} for v in votes],
+            },
+        }
+
+    def run_round(
+        self,
+        transcript: List[Dict],
+        on_message: Optional[Callable[[Dict], None]] = None,
+        on_delta: Optional[Callable[[Dict], None]] = None,
+        cancel_token: Optional["CancelToken"] = None,
+    ) -> List[Dict]:
+        """
+        Plays one full round, appending to `transcript` in place, and returns the
+        new messages. `cancel_token` is checked before every turn; a cancelled
+        round raises JobCancelled with the transcript holding the turns so far.
+        """
+        round_num = transcript[-1]["round"] + 1 if transcript else 1
+        with timed("summary_update"):
+            self.update_summary(transcript, round_num)
+        new_messages = []
+        for agent in self.turn_order:
+            if cancel_token is not None:
+                cancel_token.check()
+            message = self.run_turn(agent, transcript, round_num, on_delta=on_delta)
+            transcript.append(message)
+            new_messages.append(message)
+            if on_message is not None:
+                on_message(message)
+        return new_messages
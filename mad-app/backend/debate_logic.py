@@ -1,132 +1,100 @@
-import os
 import uuid
-from typing import List, Dict
-from dotenv import load_dotenv
-from autogen.agentchat import AssistantAgent, GroupChat, GroupChatManager, UserProxyAgent
+from typing import List, Dict, Callable, Optional
+from debate_engine import DebateEngine
+from job_queue import CancelToken
+from metrics import timed, summarize_turns, add_totals
+from nlp_logic import update_analysis
+from session_store import get_session_store
+
+# Serialized session state (topic, agent configs, transcript, rolling summary);
+# the engine is rebuilt per request
+SESSIONS = get_session_store()
+# Running keyword-analysis state per session. Kept apart, with its own cap
+# (ANALYSIS_MAX_STATES), so these larger entries never push live sessions out.
+ANALYSIS_STATES = get_session_store(table="analysis_states", max_sessions_env="ANALYSIS_MAX_STATES")
+
+def round_metrics(engine: DebateEngine, session_totals: Dict) -> Dict:
+    """Per-turn timings and token counts for the round just played, plus running session totals."""
+    return {
+        "turns": engine.turn_stats,
+        "round": summarize_turns(engine.turn_stats),
+        "session": session_totals,
+    }
 
-load_dotenv()
-API_KEY = os.getenv("OPENAI_API_KEY")
+def create_debate_session(
+    topic: str,
+    agents_config: List[Dict],
+    session_id: Optional[str] = None,
+    on_message: Optional[Callable[[Dict], None]] = None,
+    on_delta: Optional[Callable[[Dict], None]] = None,
+    cancel_token: Optional[CancelToken] = None,
+) -> Dict:
+    session_id = session_id or str(uuid.uuid4())
+    engine = DebateEngine(topic, agents_config)
 
-LLM_CONFIG = {
-    "config_list": [{"model": "gpt-4o-mini", "api_key": API_KEY}],
-    "cache_seed": None
-}
+    # Run Round 1
+    transcript = []
+    with timed("round"):
+        new_messages = engine.run_round(transcript, on_message=on_message, on_delta=on_delta, cancel_token=cancel_token)
+    totals = summarize_turns(engine.turn_stats)
+
+    SESSIONS.put(session_id, {
+        "topic": topic,
+        "agents_config": agents_config,
+        "messages": transcript,
+        "summary": engine.summary,
+        "metrics": totals,
+    })
 
-SESSIONS = {}
+    return {
+        "session_id": session_id,
+        "messages": new_messages,
+        "metrics": round_metrics(engine, totals),
+    }
 
-def parse_messages(messages: List[Dict], start_index: int = 0) -> List[Dict]:
+def continue_debate_session(
+    session_id: str,
+    on_message: Optional[Callable[[Dict], None]] = None,
+    on_delta: Optional[Callable[[Dict], None]] = None,
+    cancel_token: Optional[CancelToken] = None,
+) -> Dict:
     """
-    Parses messages to assign correct round numbers.
-    Crucially, it iterates through the FULL history to track round progression,
-    then only returns the messages that are new (>= start_index).
+    Plays the next round. If the round is cancelled partway, JobCancelled
+    propagates before anything is stored, so the session stays at the last
+    complete round.
     """
-    structured_messages = []
-    current_round = 1
-    
-    for i, msg in enumerate(messages):
-        agent_name = msg.get("name", "unknown")
-        content = msg.get("content", "").strip()
-        
-        # Skip system commands
-        if "TERMINATE" in content or "Proceed to next round" in content:
-            continue
-            
-        if content:
-            # Only add to output if it's a new message
-            if i >= start_index:
-                structured_messages.append({
-                    "round": current_round, 
-                    "agent": agent_name,
-                    "content": content
-                })
-            
-            # Increment round AFTER processing the Judge's message
-            # This ensures the Judge is included in the current round, 
-            # and the NEXT message starts the new round.
-            if agent_name == "Judge":
-                current_round += 1
-
-    return structured_messages
-
-def create_debate_session(topic: str, agents_config: List[Dict]) -> Dict:
-    session_id = str(uuid.uuid4())
-    
-    debaters = []
-    judge = None
-    
-    for agent_conf in agents_config:
-        if agent_conf['name'].startswith("Debater_"):
-            debaters.append(AssistantAgent(
-                name=agent_conf['name'],
-                system_message=agent_conf['systemMessage'],
-                llm_config=LLM_CONFIG,
-            ))
-        elif agent_conf['name'] == "Judge":
-            judge = AssistantAgent(
-                name=agent_conf['name'],
-                system_message=agent_conf['systemMessage'],
-                llm_config=LLM_CONFIG,
-            )
-
-    user_proxy = UserProxyAgent(
-        name="Moderator",
-        human_input_mode="NEVER",
-        code_execution_config=False,
-    )
-
-    # Start with enough rounds for the intro + 3 turns
-    group_chat = GroupChat(
-        agents=[user_proxy, *debaters, judge],
-        messages=[],
-        max_round=4, 
-        speaker_selection_method="round_robin"
-    )
-
-    manager = GroupChatManager(groupchat=group_chat, llm_config=LLM_CONFIG)
+    session = SESSIONS.get(session_id)
+    if session is None:
+        return {"error": "Session not found"}
 
-    # Run Round 1
-    user_proxy.initiate_chat(manager, message=f"Debate Topic: {topic}")
+    # The engine numbers rounds from the transcript itself, so there is no
+    # round limit to bump and no moderator message to filter back out
+    engine = DebateEngine(session["topic"], session["agents_config"], summary=session.get("summary"))
+    transcript = session["messages"]
+    with timed("round"):
+        new_messages = engine.run_round(transcript, on_message=on_message, on_delta=on_delta, cancel_token=cancel_token)
+    session["summary"] = engine.summary
+    session["metrics"] = add_totals(session.get("metrics", {}), summarize_turns(engine.turn_stats))
 
-    SESSIONS[session_id] = {
-        "group_chat": group_chat,
-        "manager": manager,
-        "user_proxy": user_proxy,
-        "sent_messages_count": len(group_chat.messages)
-    }
+    SESSIONS.put(session_id, session)
 
     return {
         "session_id": session_id,
-        "messages": parse_messages(group_chat.messages, start_index=1)
+        "messages": new_messages,
+        "metrics": round_metrics(engine, session["metrics"]),
     }
 
-def continue_debate_session(session_id: str) -> Dict:
-    if session_id not in SESSIONS:
+def analyze_debate_session(session_id: str) -> Dict:
+    """
+    Keyword analysis of a live session, read straight from the stored transcript.
+    The running analysis state is kept in its own store so it never races with
+    a concurrent continue_debate_session writing the transcript. If it has been
+    evicted, the analysis simply starts over from the transcript.
+    """
+    session = SESSIONS.get(session_id)
+    if session is None:
         return {"error": "Session not found"}
 
-    session = SESSIONS[session_id]
-    group_chat = session["group_chat"]
-    manager = session["manager"]
-    user_proxy = session["user_proxy"]
-    last_count = session["sent_messages_count"]
-
-    # Increase round limit for next 3 turns (A -> B -> Judge)
-    # Adding 4 to safe-guard against system prompts consuming rounds
-    group_chat.max_round += 4
-    
-    user_proxy.initiate_chat(
-        manager, 
-        message="Moderator: Proceed to the next round of arguments.", 
-        clear_history=False
-    )
-
-    # Key Change: We pass the FULL message list to parse_messages, 
-    # but tell it to only return items starting from `last_count`
-    all_messages = group_chat.messages
-    new_messages = parse_messages(all_messages, start_index=last_count)
-    
-    session["sent_messages_count"] = len(all_messages)
-
-    return {
-        "session_id": session_id,
-        "messages": new_messages
-    }
\ No newline at end of file
+    result, state = update_analysis(session["messages"], ANALYSIS_STATES.get(session_id))
+    ANALYSIS_STATES.put(session_id, state)
+    return result
@@ -0,0 +1,187 @@
+import os
+import math
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# JOB_WORKERS debate steps run at once; up to JOB_MAX_QUEUED more wait for a
+# worker. Anything beyond that is turned away with QueueFull (HTTP 429).
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "16"))
+# Finished jobs kept around for status polling
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+
+class JobCancelled(Exception):
+    pass
+
+class SessionBusy(Exception):
+    """A session already has a job queued or running; steps on one session must not overlap."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Session already has a job in progress ({job_id})")
+        self.job_id = job_id
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class CancelToken:
+    """Set from the request side, checked by the engine between agent turns."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled()
+
+class Job:
+    def __init__(self, kind: str, session_id: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.session_id = session_id
+        self.status = "queued"  # queued -> running -> done | error | cancelled
+        self.token = CancelToken()
+        self.future: Optional[Future] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error", "cancelled")
+
+    def to_dict(self) -> Dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "session_id": self.session_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "done":
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+class JobQueue:
+    """
+    Bounded pool for blocking debate steps. Each job gets a CancelToken; a
+    queued job that is cancelled never starts, and a running one stops at the
+    next turn boundary.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED, history: int = JOB_HISTORY):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="debate-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._avg_seconds: Optional[float] = None
+
+    def _counts(self):
+        queued = sum(1 for job in self._jobs.values() if job.status == "queued")
+        running = sum(1 for job in self._jobs.values() if job.status == "running")
+        return queued, running
+
+    def retry_after(self, queued: int) -> int:
+        """Rough wait in seconds until a slot frees up, from the average job duration."""
+        avg = self._avg_seconds or 5.0
+        return max(1, math.ceil(avg * (queued + 1) / self.max_workers))
+
+    def submit(self, kind: str, fn: Callable[[CancelToken], Any], session_id: Optional[str] = None) -> Job:
+        """
+        Queues fn(cancel_token). Raises SessionBusy if session_id already has an
+        unfinished job (two rounds would both read the same transcript and the
+        last write would win), or QueueFull if every worker and queue slot is taken.
+        """
+        job = Job(kind, session_id)
+        with self._lock:
+            if session_id is not None:
+                for other in self._jobs.values():
+                    if other.session_id == session_id and not other.finished:
+                        raise SessionBusy(other.id)
+            queued, running = self._counts()
+            if running >= self.max_workers and queued >= self.max_queued:
+                raise QueueFull(self.retry_after(queued))
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[CancelToken], Any]) -> Any:
+        with self._lock:
+            if job.token.cancelled:
+                # Normally already marked by cancel(); this covers a token cancelled directly
+                if not job.finished:
+                    job.status = "cancelled"
+                    job.finished_at = time.time()
+                raise JobCancelled()
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result = fn(job.token)
+        except JobCancelled:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status, job.error = "error", str(e)
+            raise
+        else:
+            job.result = result
+            if isinstance(result, dict) and "error" in result:
+                job.status, job.error = "error", result["error"]
+            else:
+                job.status = "done"
+            return result
+        finally:
+            job.finished_at = time.time()
+            seconds = job.finished_at - job.started_at
+            with self._lock:
+                self._avg_seconds = seconds if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * seconds
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs once we're over the history limit
+        excess = len(self._jobs) - self.history
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.token.cancel()
+            if job.status == "queued":
+                # Frees its queue slot now; the worker skips it when it gets there
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def stats(self) -> Dict:
+        with self._lock:
+            queued, running = self._counts()
+        return {"workers": self.max_workers, "max_queued": self.max_queued, "queued": queued, "running": running}
+
+JOBS = JobQueue()
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import TYPE_CHECKING, Dict, Callable, Optional
+from dotenv import load_dotenv
+from metrics import observe_llm_call
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from openai.types.chat import ChatCompletion
+
+load_dotenv()
+
+# LLM_CACHE_MODE:
+#   passthrough -> no caching, every call goes to the API (default)
+#   record      -> every call goes to the API and its response is (re)written to the cache
+#   replay      -> responses come only from the cache; a miss raises CacheMiss
+CACHE_MODE = os.getenv("LLM_CACHE_MODE", "passthrough").lower()
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Request fields that only change how a response is delivered, not what it says
+_TRANSPORT_PARAMS = ("stream", "stream_options")
+
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+def get_client() -> "OpenAI":
+    """Shared OpenAI client, created (and the openai package imported) on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                # OPENAI_BASE_URL redirects every call, e.g. to stub_openai.py for benchmarks
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL"))
+    return _client
+
+class CacheMiss(LookupError):
+    pass
+
+class ResponseCache:
+    """
+    Content-addressed on-disk store of chat completions. Keys are the SHA-256 of
+    the canonical request (model, messages and every other parameter). Entries
+    are evicted least-recently-used first once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def key(params: Dict) -> str:
+        request = {k: v for k, v in params.items() if k not in _TRANSPORT_PARAMS}
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass  # evicted since the read; the data we got is still good
+        return data
+
+    def put(self, key: str, data: Dict) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(payload)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self) -> None:
+        # Trim to 90% so we don't rescan the directory on every subsequent write
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._size = total
+
+CACHE = ResponseCache()
+
+def _collect_stream(client: "OpenAI", params: Dict, on_delta: Callable[[str], None]) -> "ChatCompletion":
+    """Streams a completion, forwarding each text delta, and rebuilds the full response."""
+    from openai.types.chat import ChatCompletion
+    parts = []
+    usage = None
+    finish_reason = "stop"
+    response_id, created, model = "", int(time.time()), params.get("model")
+    stream = client.chat.completions.create(**params, stream=True, stream_options={"include_usage": True})
+    for chunk in stream:
+        response_id, created, model = chunk.id, chunk.created, chunk.model
+        if chunk.usage is not None:
+            usage = chunk.usage.model_dump()
+        if chunk.choices:
+            choice = chunk.choices[0]
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+                on_delta(choice.delta.content)
+
+    return ChatCompletion.model_validate({
+        "id": response_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(parts)},
+            "finish_reason": finish_reason,
+        }],
+        "usage": usage,
+    })
+
+def chat_completion(
+    client: Optional["OpenAI"] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    stage: str = "llm",
+    **params,
+) -> "ChatCompletion":
+    """
+    Drop-in for client.chat.completions.create(**params) that goes through the
+    response cache according to LLM_CACHE_MODE. Pass on_delta to stream text as
+    it is generated; a cached response is delivered as a single delta.
+    Responses served from the cache carry `cached=True`. Every call's wall time
+    and token usage is recorded under `stage` in the metrics registry.
+    """
+    from openai.types.chat import ChatCompletion
+
+    started = time.perf_counter()
+    key = None
+    if CACHE_MODE != "passthrough":
+        key = CACHE.key(params)
+        if CACHE_MODE == "replay":
+            data = CACHE.get(key)
+            if data is None:
+                raise CacheMiss(f"No cached response for request {key[:12]} (LLM_CACHE_MODE=replay)")
+            response = ChatCompletion.model_validate({**data, "cached": True})
+            if on_delta is not None and response.choices[0].message.content:
+                on_delta(response.choices[0].message.content)
+            observe_llm_call(stage, params.get("model"), time.perf_counter() - started, response.usage, cached=True)
+            return response
+
+    client = client or get_client()
+    if on_delta is None:
+        response = client.chat.completions.create(**params)
+    else:
+        response = _collect_stream(client, params, on_delta)
+
+    observe_llm_call(stage, params.get("model"), time.perf_counter() - started, response.usage, cached=False)
+    if key is not None:
+        CACHE.put(key, response.model_dump(mode="json"))
+    return response
@@ -1,14 +1,46 @@
-from fastapi import FastAPI, HTTPException
+import os
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Callable, AsyncIterator, Literal, Optional
 
 # Import the correct function name from your logic file
-from debate_logic import create_debate_session, continue_debate_session
+from debate_logic import create_debate_session, continue_debate_session, analyze_debate_session
+import nlp_logic
+import mast_logic
 from nlp_logic import perform_analysis
-from mast_logic import analyze_round_taxonomy  # Make sure this matches your mast_logic.py
+from mast_logic import analyze_rounds_taxonomy
+from job_queue import JOBS, Job, JobCancelled, QueueFull, SessionBusy, CancelToken
+import metrics
+from result_cache import ResultCache
 
-app = FastAPI()
+metrics.register_gauge("mad_jobs_running", "Debate jobs running now", lambda: JOBS.stats()["running"])
+metrics.register_gauge("mad_jobs_queued", "Debate jobs waiting for a worker", lambda: JOBS.stats()["queued"])
+
+# The frontend re-sends identical analysis payloads (e.g. on re-render)
+ANALYSIS_CACHE = ResultCache("analysis", max_entries=256)
+TAXONOMY_CACHE = ResultCache("taxonomy", max_entries=1024, version=mast_logic.JUDGE_MODEL)
+metrics.register_gauge("mad_analysis_cache_entries", "Cached /api/analyze-debate results", lambda: ANALYSIS_CACHE.stats()["entries"])
+metrics.register_gauge("mad_taxonomy_cache_entries", "Cached /api/analyze-taxonomy results", lambda: TAXONOMY_CACHE.stats()["entries"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy NLP modules, the MAST definitions and the OpenAI client load lazily
+    # on first use. WARMUP_ON_STARTUP=1 loads them in the background at boot
+    # instead, so the first real request doesn't pay for it.
+    if os.getenv("WARMUP_ON_STARTUP") == "1":
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(None, nlp_logic.warm_up)
+        loop.run_in_executor(None, mast_logic.warm_up)
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,11 +48,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # read by the frontend to send If-None-Match on analysis requests
 )
 
+class ContextPolicy(BaseModel):
+    mode: Literal["full", "last_k", "summary"] = "full"
+    window: int = Field(2, ge=0)
+    maxPromptTokens: Optional[int] = Field(None, ge=1)
+
+class PanelJudge(BaseModel):
+    # Either field falls back to the Judge's own system message / the engine's model
+    model: Optional[str] = None
+    systemMessage: Optional[str] = None
+    weight: float = 1.0
+
 class AgentConfig(BaseModel):
     name: str
     systemMessage: str
+    contextPolicy: Optional[ContextPolicy] = None
+    # Judge only: decide each round with several judges in parallel
+    panel: Optional[List[PanelJudge]] = Field(None, min_length=1, max_length=9)
+    aggregation: Literal["majority", "weighted"] = "majority"
 
 class DebateRequest(BaseModel):
     topic: str
@@ -29,33 +77,232 @@ class DebateRequest(BaseModel):
 class ContinueRequest(BaseModel):
     session_id: str
 
+class SessionRequest(BaseModel):
+    session_id: str
+
 class AnalysisRequest(BaseModel):
     messages: List[Dict]
 
-@app.post("/api/start-debate")
-async def api_start_debate(request: DebateRequest):
-    """Starts a new live session"""
+class TaxonomyRequest(BaseModel):
+    messages: List[Dict]
+    # Optional context for the local pre-filter: the topic and earlier messages
+    topic: Optional[str] = None
+    history: List[Dict] = []
+    prefilter: bool = False  # opt-in until the bands are calibrated on more transcripts
+
+class TaxonomyBatchRequest(BaseModel):
+    # Any number of rounds' messages; grouped by their "round" field
+    messages: List[Dict]
+    topic: Optional[str] = None
+    concurrency: int = Field(8, ge=1, le=32)
+    prefilter: bool = False
+
+async def _cached(cache: ResultCache, payload: Dict, if_none_match: Optional[str], compute: Callable) -> Response:
+    """Serves an analysis result through `cache`, with an ETag derived from the payload."""
+    key = cache.key(payload)
+    headers = {"ETag": cache.etag(key)}
+    if cache.not_modified(key, if_none_match):
+        return Response(status_code=304, headers=headers)
+    result = await cache.get_or_compute(key, compute)
+    return JSONResponse(result, headers=headers)
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _submit(kind: str, run: Callable[[CancelToken], Dict], session_id: Optional[str] = None) -> Job:
+    """Queues a debate step, turning a busy session into 409 and a full queue into 429 + Retry-After."""
+    try:
+        return JOBS.submit(kind, run, session_id=session_id)
+    except SessionBusy as e:
+        raise HTTPException(status_code=409, detail=f"This debate already has a round in progress (job {e.job_id})")
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many debates in progress, try again shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+async def _await_job(job: Job) -> Dict:
     try:
-        agents_dict = [agent.dict() for agent in request.agents_config]
-        return create_debate_session(request.topic, agents_dict)
+        return await asyncio.wrap_future(job.future)
+    except JobCancelled:
+        raise HTTPException(status_code=409, detail="Debate job was cancelled")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _stream_job(kind: str, session_id: str, run: Callable[..., Dict]) -> StreamingResponse:
+    """
+    Queues a blocking debate step and relays every token delta and finished
+    agent message to the client as server-sent events. The job is cancelled
+    if the client goes away before it finishes.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_message(message: Dict) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, ("message", message))
+
+    def on_delta(delta: Dict) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, ("delta", delta))
+
+    job = _submit(
+        kind,
+        lambda cancel_token: run(on_message=on_message, on_delta=on_delta, cancel_token=cancel_token),
+        session_id=session_id,
+    )
+    # The wrapped future resolves on the loop after every callback above,
+    # so the None sentinel always arrives behind the last event.
+    future = asyncio.wrap_future(job.future)
+    future.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            yield _sse("session", {"session_id": session_id, "job_id": job.id})
+            while (item := await queue.get()) is not None:
+                yield _sse(*item)
+
+            try:
+                result = future.result()
+            except JobCancelled:
+                yield _sse("cancelled", {"job_id": job.id})
+                return
+            except Exception as e:
+                yield _sse("error", {"detail": str(e)})
+                return
+            if "error" in result:
+                yield _sse("error", {"detail": result["error"]})
+            else:
+                yield _sse("done", result)
+        finally:
+            if not future.done():
+                JOBS.cancel(job.id)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/api/start-debate")
+async def api_start_debate(request: DebateRequest):
+    """Starts a new live session"""
+    agents_dict = [agent.dict() for agent in request.agents_config]
+    session_id = str(uuid.uuid4())
+    job = _submit(
+        "start",
+        lambda cancel_token: create_debate_session(request.topic, agents_dict, session_id=session_id, cancel_token=cancel_token),
+        session_id=session_id,
+    )
+    return await _await_job(job)
+
 @app.post("/api/continue-debate")
 async def api_continue_debate(request: ContinueRequest):
     """Steps the live session forward one round"""
-    try:
-        return continue_debate_session(request.session_id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job = _submit(
+        "continue",
+        lambda cancel_token: continue_debate_session(request.session_id, cancel_token=cancel_token),
+        session_id=request.session_id,
+    )
+    return await _await_job(job)
+
+@app.post("/api/start-debate/stream")
+async def api_start_debate_stream(request: DebateRequest):
+    """Starts a new live session, streaming tokens and agent messages as SSE events"""
+    session_id = str(uuid.uuid4())
+    agents_dict = [agent.dict() for agent in request.agents_config]
+    run = lambda **kwargs: create_debate_session(
+        request.topic, agents_dict, session_id=session_id, **kwargs
+    )
+    return _stream_job("start", session_id, run)
+
+@app.post("/api/continue-debate/stream")
+async def api_continue_debate_stream(request: ContinueRequest):
+    """Steps the live session forward one round, streaming tokens and agent messages"""
+    run = lambda **kwargs: continue_debate_session(request.session_id, **kwargs)
+    return _stream_job("continue", request.session_id, run)
+
+@app.post("/api/jobs/start-debate", status_code=202)
+async def api_submit_start_debate(request: DebateRequest):
+    """Queues a new session's first round and returns its job for polling"""
+    agents_dict = [agent.dict() for agent in request.agents_config]
+    session_id = str(uuid.uuid4())
+    job = _submit(
+        "start",
+        lambda cancel_token: create_debate_session(request.topic, agents_dict, session_id=session_id, cancel_token=cancel_token),
+        session_id=session_id,
+    )
+    return job.to_dict()
+
+@app.post("/api/jobs/continue-debate", status_code=202)
+async def api_submit_continue_debate(request: ContinueRequest):
+    """Queues the session's next round and returns its job for polling"""
+    job = _submit(
+        "continue",
+        lambda cancel_token: continue_debate_session(request.session_id, cancel_token=cancel_token),
+        session_id=request.session_id,
+    )
+    return job.to_dict()
+
+@app.get("/api/jobs/{job_id}")
+async def api_job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def api_cancel_job(job_id: str):
+    """Stops a job: queued jobs never start, running ones stop before the next agent turn"""
+    job = JOBS.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/api/jobs")
+async def api_job_stats():
+    return JOBS.stats()
 
 @app.post("/api/analyze-debate")
-async def api_analyze_debate(request: AnalysisRequest):
-    return perform_analysis(request.messages)
+async def api_analyze_debate(request: AnalysisRequest, if_none_match: Optional[str] = Header(None)):
+    return await _cached(
+        ANALYSIS_CACHE, request.dict(), if_none_match,
+        lambda: run_in_threadpool(perform_analysis, request.messages),
+    )
+
+@app.post("/api/analyze-session")
+async def api_analyze_session(request: SessionRequest):
+    """Analyzes a live session server-side, processing only rounds added since the last call"""
+    result = await run_in_threadpool(analyze_debate_session, request.session_id)
+    if result.get("error") == "Session not found":
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
 
 @app.post("/api/analyze-taxonomy")
-async def api_analyze_taxonomy(request: AnalysisRequest):
+async def api_analyze_taxonomy(request: TaxonomyRequest, if_none_match: Optional[str] = Header(None)):
+    async def compute() -> Dict:
+        [verdict] = await analyze_rounds_taxonomy(
+            [request.messages], topic=request.topic, history=request.history, prefilter=request.prefilter
+        )
+        return verdict
+
     try:
-        return analyze_round_taxonomy(request.messages)
+        # topic/history are only read by the pre-filter, so they only key the cache when it runs
+        payload = request.dict() if request.prefilter else {"messages": request.messages, "prefilter": False}
+        return await _cached(TAXONOMY_CACHE, payload, if_none_match, compute)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/analyze-taxonomy/batch")
+async def api_analyze_taxonomy_batch(request: TaxonomyBatchRequest):
+    """Diagnoses every round of a transcript in parallel; returns {round: verdict}"""
+    rounds: Dict[int, List[Dict]] = {}
+    for message in request.messages:
+        rounds.setdefault(message.get("round", 0), []).append(message)
+    try:
+        verdicts = await analyze_rounds_taxonomy(
+            list(rounds.values()), concurrency=request.concurrency, topic=request.topic, prefilter=request.prefilter
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return dict(zip(rounds.keys(), verdicts))
+
+@app.get("/metrics")
+async def api_metrics():
+    """LLM call latency/tokens/cache hits, stage timings and job queue depth, for Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,43 +1,152 @@
 import os
-from typing import List, Dict
-from openai import OpenAI
+import re
+import copy
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional
+from llm_cache import chat_completion, get_client
+from mast_prefilter import round_signals, needs_judge, local_verdict
+from metrics import CACHE_HITS, TAXONOMY_ROUNDS, timed
 
-# Load the official taxonomy definitions [cite: 3362]
-with open("definitions.txt", "r") as f:
-    MAST_DEFINITIONS = f.read()
+DEFINITIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "definitions.txt")
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_definitions: Optional[str] = None
+_definitions_lock = threading.Lock()
+
+def get_definitions() -> str:
+    """The official taxonomy definitions [cite: 3362], read on first use."""
+    global _definitions
+    if _definitions is None:
+        with _definitions_lock:
+            if _definitions is None:
+                with open(DEFINITIONS_PATH, "r") as f:
+                    _definitions = f.read()
+    return _definitions
+
+def failure_modes() -> List[Dict]:
+    """The 14 modes as [{"id": "1.1", "name": "Disobey Task Specification"}, ...]"""
+    return [
+        {"id": mode_id, "name": name.strip()}
+        for mode_id, name in re.findall(r"^(\d\.\d+) ([^:\n]+):", get_definitions(), flags=re.MULTILINE)
+    ]
+
+def warm_up() -> None:
+    get_definitions()
+    get_client()
+
+# Everything that doesn't depend on the round goes in the system message, so
+# every call shares the same long prefix and the provider's prompt cache can
+# reuse it; only the transcript in the user message changes.
+# Prompt structure inspired by llm_judge_pipeline.ipynb
+SYSTEM_PROMPT = """
+You are an expert Multi-Agent System (MAS) diagnostic judge. 
+Analyze the round of an AI debate given by the user using the MAST Taxonomy.
+
+TAXONOMY DEFINITIONS:
+{definitions}
+
+Analyze the behavior. Return a JSON object: 
+{{
+    "summary": "Brief freeform text summary of failures/inefficiencies",
+    "task_progress": "yes/no",
+    "failures": [
+        {{ "id": "1.3", "name": "Step Repetition", "detected": true }},
+        ... (include all 14 modes as binary values)
+    ]
+}}
+"""
+
+JUDGE_MODEL = "gpt-4o"  # Or o1 as used in the paper for high agreement [cite: 2039]
+VERDICT_CACHE_SIZE = 1024
+DEFAULT_CONCURRENCY = 8
+
+_verdicts: "OrderedDict[str, Dict]" = OrderedDict()
+_verdicts_lock = threading.Lock()
+
+def format_transcript(messages: List[Dict]) -> str:
+    return "\n".join([f"{m['agent']}: {m['content']}" for m in messages])
+
+def _verdict_key(transcript: str) -> str:
+    return hashlib.sha256(f"{JUDGE_MODEL}\n{transcript}".encode("utf-8")).hexdigest()
 
 def analyze_round_taxonomy(messages: List[Dict]) -> Dict:
     # Format round messages for the judge
-    transcript = "\n".join([f"{m['agent']}: {m['content']}" for m in messages])
-    
-    # Prompt structure inspired by llm_judge_pipeline.ipynb
-    prompt = f"""
-    You are an expert Multi-Agent System (MAS) diagnostic judge. 
-    Analyze the following round of an AI debate using the MAST Taxonomy.
-    
-    TAXONOMY DEFINITIONS:
-    {MAST_DEFINITIONS}
-    
-    ROUND TRANSCRIPT:
-    {transcript}
-    
-    Analyze the behavior. Return a JSON object: 
-    {{
-        "summary": "Brief freeform text summary of failures/inefficiencies",
-        "task_progress": "yes/no",
-        "failures": [
-            {{ "id": "1.3", "name": "Step Repetition", "detected": true }},
-            ... (include all 14 modes as binary values)
-        ]
-    }}
-    """
-    
-    response = client.chat.completions.create(
-        model="gpt-4o", # Or o1 as used in the paper for high agreement [cite: 2039]
-        messages=[{"role": "system", "content": prompt}],
+    transcript = format_transcript(messages)
+
+    # Identical transcripts always get the same verdict back
+    key = _verdict_key(transcript)
+    with _verdicts_lock:
+        if key in _verdicts:
+            _verdicts.move_to_end(key)
+            CACHE_HITS.inc(cache="verdict")
+            return copy.deepcopy(_verdicts[key])
+
+    response = chat_completion(
+        stage="taxonomy",
+        model=JUDGE_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT.format(definitions=get_definitions())},
+            {"role": "user", "content": f"ROUND TRANSCRIPT:\n{transcript}"},
+        ],
         response_format={ "type": "json_object" }
     )
-    import json
-    return json.loads(response.choices[0].message.content)
\ No newline at end of file
+    verdict = json.loads(response.choices[0].message.content)
+
+    with _verdicts_lock:
+        _verdicts[key] = verdict
+        while len(_verdicts) > VERDICT_CACHE_SIZE:
+            _verdicts.popitem(last=False)
+    return copy.deepcopy(verdict)
+
+async def analyze_rounds_taxonomy(
+    rounds: List[List[Dict]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    topic: Optional[str] = None,
+    history: Optional[List[Dict]] = None,
+    prefilter: bool = False,
+) -> List[Dict]:
+    """
+    Judges many rounds at once with at most `concurrency` calls in flight.
+    Duplicate transcripts in the batch are judged once. Results are returned in
+    the order of `rounds`. The blocking calls run in worker threads, so the
+    event loop stays free.
+
+    With `prefilter`, rounds are first scored locally (see mast_prefilter), and
+    only rounds in the uncertain band reach the LLM. The rest get a provisional
+    local verdict. `history` holds earlier messages used as context for those scores.
+    """
+    results: List[Optional[Dict]] = [None] * len(rounds)
+    signals: List[Optional[Dict]] = [None] * len(rounds)
+    if prefilter:
+        with timed("prefilter"):
+            signals = await asyncio.to_thread(round_signals, rounds, topic, history)
+        modes = failure_modes()
+        for i, round_signal in enumerate(signals):
+            if not needs_judge(round_signal):
+                results[i] = local_verdict(round_signal, modes)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    unique: Dict[str, List[Dict]] = {}
+    keys: Dict[int, str] = {}
+    for i, messages in enumerate(rounds):
+        if results[i] is None:
+            keys[i] = _verdict_key(format_transcript(messages))
+            unique.setdefault(keys[i], messages)
+
+    async def judge(messages: List[Dict]) -> Dict:
+        async with semaphore:
+            return await asyncio.to_thread(analyze_round_taxonomy, messages)
+
+    with timed("taxonomy_judge"):
+        verdicts = await asyncio.gather(*(judge(messages) for messages in unique.values()))
+    by_key = dict(zip(unique.keys(), verdicts))
+    for i, key in keys.items():
+        results[i] = {**copy.deepcopy(by_key[key]), "source": "llm"}
+        if signals[i] is not None:
+            results[i]["signals"] = signals[i]
+    for result in results:
+        TAXONOMY_ROUNDS.inc(source=result["source"])
+    return results
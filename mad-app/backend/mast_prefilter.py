@@ -0,0 +1,116 @@
+"""
+Cheap local estimates of the MAST failure modes that can be measured from
+text alone, run in front of the gpt-4o judge:
+
+  1.3 Step Repetition  -> word-trigram overlap with the same debater's earlier turns
+  2.3 Task Derailment  -> how little a turn relates to the topic or to the
+                          opponent's recent turns (tf-idf cosine)
+
+Rounds whose scores are clearly low or clearly high get a provisional local
+verdict. Only rounds that land inside an uncertain band go to the LLM judge.
+
+The derailment score is lexical, so it can only clear a round, never flag
+one: turns that paraphrase the topic instead of reusing its words score ~1.0
+while being perfectly on topic. On the sample transcript (debate_history.txt)
+on-topic rounds score 0.5-0.72; anything at or above the band's low end goes
+to the judge. The bands are rough, which is why the pre-filter is off by
+default.
+"""
+from typing import List, Dict, Optional
+
+# (low, high): below low is confidently clean, above high is confidently a failure
+REPETITION_BAND = (0.15, 0.5)
+OFF_TOPIC_BAND = (0.9, float("inf"))  # no upper end: a high score is never flagged locally
+
+SIGNAL_MODES = {"repetition": "1.3", "off_topic": "2.3"}
+BANDS = {"repetition": REPETITION_BAND, "off_topic": OFF_TOPIC_BAND}
+
+def round_signals(
+    rounds: List[List[Dict]],
+    topic: Optional[str] = None,
+    history: Optional[List[Dict]] = None,
+) -> List[Dict]:
+    """
+    One {"repetition", "off_topic"} dict per round, each the worst score of any
+    debater turn in that round. Earlier turns in `history` and in preceding
+    rounds count as context. All turns are scored together with a couple of
+    sparse matrix products rather than pairwise in Python.
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+    turns = [(-1, m) for m in history or []]
+    turns += [(i, m) for i, messages in enumerate(rounds) for m in messages]
+    turns = [(i, m) for i, m in turns if m.get("agent", "").startswith("Debater_") and m.get("content")]
+
+    empty = [{"repetition": 0.0, "off_topic": 0.0} for _ in rounds]
+    if not turns:
+        return empty
+
+    texts = [m["content"] for _, m in turns]
+    agents = np.array([m["agent"] for _, m in turns])
+    owner = np.array([i for i, _ in turns])
+    position = np.arange(len(turns))
+    earlier = position[None, :] < position[:, None]  # [i, j]: turn j came before turn i
+    same_agent = agents[:, None] == agents[None, :]
+
+    # Step repetition: Jaccard overlap of word trigram sets
+    repetition = np.zeros(len(turns))
+    try:
+        trigrams = CountVectorizer(ngram_range=(3, 3), binary=True).fit_transform(texts)
+        shared = (trigrams @ trigrams.T).toarray()
+        sizes = np.diag(shared)
+        union = np.maximum(sizes[:, None] + sizes[None, :] - shared, 1)
+        repetition = np.where(earlier & same_agent, shared / union, 0).max(axis=1)
+    except ValueError:  # every turn shorter than three words
+        pass
+
+    # Derailment: best tf-idf cosine to the topic or the opponent's turns from
+    # this or the previous round. Turns with nothing to compare to score 0.
+    off_topic = np.zeros(len(turns))
+    try:
+        corpus = texts + ([topic] if topic else [])
+        vectors = TfidfVectorizer(stop_words="english").fit_transform(corpus)
+        cosine = (vectors @ vectors.T).toarray()
+        recent = owner[None, :] >= owner[:, None] - 1
+        context = earlier & ~same_agent & recent
+        relevance = np.where(context, cosine[:len(turns), :len(turns)], 0).max(axis=1)
+        if topic:
+            relevance = np.maximum(relevance, cosine[:len(turns), -1])
+        has_context = context.any(axis=1) | bool(topic)
+        off_topic = np.where(has_context, 1 - relevance, 0)
+    except ValueError:  # empty vocabulary
+        pass
+
+    for i in range(len(rounds)):
+        mask = owner == i
+        if mask.any():
+            empty[i] = {
+                "repetition": round(float(repetition[mask].max()), 4),
+                "off_topic": round(float(off_topic[mask].max()), 4),
+            }
+    return empty
+
+def needs_judge(signals: Dict) -> bool:
+    """True when any signal sits inside its uncertain band."""
+    return any(BANDS[name][0] <= value <= BANDS[name][1] for name, value in signals.items())
+
+def local_verdict(signals: Dict, modes: List[Dict]) -> Dict:
+    """
+    Provisional verdict in the judge's response format. Modes the pre-filter
+    can't measure are reported as not detected.
+    """
+    flagged = {SIGNAL_MODES[name] for name, value in signals.items() if value > BANDS[name][1]}
+    failures = [{**mode, "detected": mode["id"] in flagged} for mode in modes]
+    detected = [f["name"] for f in failures if f["detected"]]
+    return {
+        "summary": (
+            f"Local pre-filter flagged: {', '.join(detected)}." if detected
+            else "Local pre-filter found no repetition or derailment."
+        ),
+        "task_progress": "no" if detected else "yes",
+        "failures": failures,
+        "provisional": True,
+        "source": "local",
+        "signals": signals,
+    }
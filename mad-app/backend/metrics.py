@@ -0,0 +1,127 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Seconds; LLM calls range from cache hits (~ms) to long judge verdicts
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, List] = {}  # key -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {bucket_count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Gauge:
+    """Read from a callback at scrape time (e.g. job queue depth)."""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+# Labels are kept to low-cardinality values (stage, model, agent role). Per
+# session / round numbers go back in each session's response instead.
+LLM_SECONDS = Histogram("mad_llm_request_seconds", "Wall time of LLM calls", ["stage", "model", "cached"])
+LLM_TOKENS = Counter("mad_llm_tokens_total", "Tokens used by LLM calls", ["stage", "model", "type"])
+STAGE_SECONDS = Histogram("mad_stage_seconds", "Wall time of debate and analysis stages", ["stage"])
+CACHE_HITS = Counter("mad_cache_hits_total", "In-process result cache hits", ["cache"])
+TAXONOMY_ROUNDS = Counter("mad_taxonomy_rounds_total", "Rounds diagnosed, by who decided the verdict", ["source"])
+
+REGISTRY: List = [LLM_SECONDS, LLM_TOKENS, STAGE_SECONDS, CACHE_HITS, TAXONOMY_ROUNDS]
+
+def register_gauge(name: str, documentation: str, read: Callable[[], float]) -> None:
+    REGISTRY.append(Gauge(name, documentation, read))
+
+def observe_llm_call(stage: str, model: str, seconds: float, usage, cached: bool) -> None:
+    LLM_SECONDS.observe(seconds, stage=stage, model=model, cached=str(bool(cached)).lower())
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, stage=stage, model=model, type="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, stage=stage, model=model, type="completion")
+
+@contextmanager
+def timed(stage: str):
+    """Times a block (or, as a decorator, a function) into mad_stage_seconds."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+def summarize_turns(turns: List[Dict]) -> Dict:
+    """Totals over a list of engine turn stats."""
+    return {
+        "seconds": round(sum(t["seconds"] for t in turns), 3),
+        "llm_calls": len(turns),
+        "cache_hits": sum(1 for t in turns if t.get("cached")),
+        "prompt_tokens": sum(t.get("prompt_tokens") or 0 for t in turns),
+        "completion_tokens": sum(t.get("completion_tokens") or 0 for t in turns),
+    }
+
+def add_totals(a: Dict, b: Dict) -> Dict:
+    return {key: round(a.get(key, 0) + b.get(key, 0), 3) for key in b}
+
+def render() -> str:
+    """Everything registered, in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,15 +1,65 @@
-import pandas as pd
+from __future__ import annotations
+
 import re
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
-from bertopic import BERTopic
-from sklearn.feature_extraction.text import CountVectorizer
+import threading
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+from metrics import timed
+
+# numpy / pandas / scipy / scikit-learn are imported on first use by
+# load_dependencies(), so importing this module (and main.py) stays cheap.
+np = pd = sp = normalize = CountVectorizer = None
+_analyzer = None
+_loaded = False
+_load_lock = threading.Lock()
+
+def load_dependencies() -> None:
+    """Imports the heavy analysis stack once; safe to call from any thread."""
+    global np, pd, sp, normalize, CountVectorizer, _analyzer, _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if _loaded:
+            return
+        import numpy as np
+        import pandas as pd
+        import scipy.sparse as sp
+        from sklearn.preprocessing import normalize
+        from sklearn.feature_extraction.text import CountVectorizer
+        _analyzer = CountVectorizer(stop_words='english').build_analyzer()
+        _loaded = True
+
+def warm_up() -> None:
+    load_dependencies()
+
+def smoothed_idf(counts: sp.csr_matrix) -> np.ndarray:
+    """Same smoothed idf as sklearn's TfidfTransformer, one document per row."""
+    n_docs = counts.shape[0]
+    doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+    return np.log((1 + n_docs) / (1 + doc_freq)) + 1
+
+def group_tfidf(counts: sp.csr_matrix, idf: np.ndarray, codes: np.ndarray, n_groups: int) -> sp.csr_matrix:
+    """
+    Sums the count rows of each group with one sparse indicator product, then
+    applies idf and L2-normalizes, giving one tf-idf row per group.
+    """
+    indicator = sp.csr_matrix(
+        (np.ones(len(codes)), (codes, np.arange(len(codes)))),
+        shape=(n_groups, counts.shape[0]),
+    )
+    return normalize(sp.csr_matrix((indicator @ counts).multiply(idf)))
 
+def top_terms(row: sp.csr_matrix, vocab: np.ndarray, top_n: int) -> List[Dict]:
+    """Highest scoring terms of a single tf-idf row (only its non-zeros are sorted)."""
+    order = np.argsort(-row.data, kind="stable")[:top_n]
+    return [{"term": str(vocab[row.indices[i]]), "score": round(float(row.data[i]), 4)} for i in order]
+
+@timed("tfidf")
 def perform_analysis(messages: List[Dict]) -> Dict:
     """
-    Performs NLP analysis (TF-IDF, Topic Modeling) on debate messages.
+    Performs NLP analysis (TF-IDF) on debate messages.
     """
+    load_dependencies()
     if not messages:
         return {"error": "No messages provided for analysis."}
         
@@ -20,53 +70,135 @@ def perform_analysis(messages: List[Dict]) -> Dict:
     if debaters_df.empty:
         return {"error": "No debater messages found for analysis."}
         
-    debate_corpus = debaters_df['clean_content'].tolist()
-    
     # --- TF-IDF Analysis ---
-    all_keywords = []
+    # One tokenization pass builds a message x term count matrix. Every view
+    # below (overall, per debater, per round) is a row-group sum of it scored
+    # with the same debate-wide idf.
     try:
-        tfidf_all = TfidfVectorizer(stop_words='english', max_features=15)
-        tfidf_all.fit(debate_corpus)
-        all_keywords = [{"term": term, "score": 0} for term in tfidf_all.get_feature_names_out()] # score is dummy for interface
-    except Exception:
-        all_keywords = [] # Failed to generate
+        vectorizer = CountVectorizer(stop_words='english')
+        counts = vectorizer.fit_transform(debaters_df['clean_content']).tocsr()
+    except ValueError:  # Empty vocabulary, e.g. only stop words
+        return {"overallKeywords": [], "keywordsByDebater": {}, "timeline": []}
 
-    keywords_by_debater = {}
-    try:
-        agent_corpus = debaters_df.groupby('agent')['clean_content'].apply(' '.join)
-        if not agent_corpus.empty:
-            tfidf_agent = TfidfVectorizer(stop_words='english', max_features=10)
-            tfidf_matrix = tfidf_agent.fit_transform(agent_corpus)
-            feature_names = tfidf_agent.get_feature_names_out()
-            for i, agent_name in enumerate(agent_corpus.index):
-                agent_scores = tfidf_matrix[i].toarray().flatten()
-                top_indices = agent_scores.argsort()[::-1][:10]
-                top_keywords = [{"term": feature_names[idx], "score": agent_scores[idx]} for idx in top_indices if agent_scores[idx] > 0]
-                keywords_by_debater[agent_name] = top_keywords
-    except Exception:
-        # Fails silently and returns empty dict
-        pass
-
-    # --- Timeline Analysis (Simplified TF-IDF per round) ---
-    timeline = []
-    for round_num in df['round'].unique():
-        round_df = debaters_df[debaters_df['round'] == round_num]
-        if round_df.empty:
-            continue
+    vocab = vectorizer.get_feature_names_out()
+    idf = smoothed_idf(counts)
+
+    overall = group_tfidf(counts, idf, np.zeros(counts.shape[0], dtype=int), 1)
+    all_keywords = top_terms(overall[0], vocab, 15)
 
-        round_keywords = {}
-        for agent_name, group in round_df.groupby('agent'):
-            try:
-                vectorizer = TfidfVectorizer(stop_words='english', max_features=5)
-                tfidf_matrix = vectorizer.fit_transform(group['clean_content'])
-                round_keywords[agent_name] = [{"term": term, "score": 0} for term in vectorizer.get_feature_names_out()]
-            except ValueError: # Happens if content is too short
-                round_keywords[agent_name] = []
+    agent_codes, agent_names = pd.factorize(debaters_df['agent'], sort=True)
+    by_agent = group_tfidf(counts, idf, agent_codes, len(agent_names))
+    keywords_by_debater = {
+        agent_name: top_terms(by_agent[i], vocab, 10) for i, agent_name in enumerate(agent_names)
+    }
 
-        timeline.append({"round": int(round_num), "keywordsByDebater": round_keywords})
+    # --- Timeline Analysis (TF-IDF per round and debater) ---
+    pairs = pd.Series(list(zip(debaters_df['round'], debaters_df['agent'])))
+    pair_codes, pair_keys = pd.factorize(pairs, sort=True)
+    by_round = group_tfidf(counts, idf, pair_codes, len(pair_keys))
+
+    timeline = []
+    for i, (round_num, agent_name) in enumerate(pair_keys):
+        if not timeline or timeline[-1]["round"] != int(round_num):
+            timeline.append({"round": int(round_num), "keywordsByDebater": {}})
+        timeline[-1]["keywordsByDebater"][agent_name] = top_terms(by_round[i], vocab, 5)
 
     return {
         "overallKeywords": all_keywords,
         "keywordsByDebater": keywords_by_debater,
         "timeline": timeline,
-    }
\ No newline at end of file
+    }
+
+# --- Incremental analysis for live sessions ---
+
+def new_analysis_state() -> Dict:
+    return {
+        "rounds_done": 0,
+        "terms": [],          # column -> term, in first-seen order
+        "doc_freq": [],       # column -> number of debater messages containing it
+        "n_docs": 0,
+        "agent_counts": {},   # debater -> running term counts (dense, one slot per column)
+        "timeline": [],
+    }
+
+def _score(counts: np.ndarray, idf: np.ndarray, terms: np.ndarray, top_n: int) -> List[Dict]:
+    """Top tf-idf terms of a dense count vector; ties break alphabetically like perform_analysis."""
+    weights = counts * idf[:len(counts)]
+    norm = np.linalg.norm(weights)
+    nonzero = np.flatnonzero(weights)
+    if norm == 0:
+        return []
+    order = nonzero[np.lexsort((terms[nonzero], -weights[nonzero]))][:top_n]
+    return [{"term": str(terms[i]), "score": round(float(weights[i] / norm), 4)} for i in order]
+
+@timed("tfidf_incremental")
+def update_analysis(messages: List[Dict], state: Optional[Dict] = None) -> Tuple[Dict, Dict]:
+    """
+    Incremental counterpart of perform_analysis for a stored session transcript.
+    Only debater messages from rounds after state["rounds_done"] are tokenized;
+    they are folded into running term and document counts. Timeline entries
+    are scored once, with the idf known when their round was added, and kept.
+    Returns (result, new_state). The state is JSON-serializable.
+    """
+    load_dependencies()
+    state = state or new_analysis_state()
+    terms, doc_freq = state["terms"], state["doc_freq"]
+    column = {term: i for i, term in enumerate(terms)}
+
+    new_rounds: Dict[int, Dict[str, Counter]] = {}
+    for msg in messages:
+        if msg["round"] <= state["rounds_done"] or not msg["agent"].startswith("Debater_"):
+            continue
+        clean = re.sub(r"^\s*Debater_[AB]:\s*", "", msg["content"], flags=re.IGNORECASE)
+        counts = Counter()
+        for token in _analyzer(clean):
+            if token not in column:
+                column[token] = len(terms)
+                terms.append(token)
+                doc_freq.append(0)
+            counts[column[token]] += 1
+        for col in counts:
+            doc_freq[col] += 1
+        state["n_docs"] += 1
+        new_rounds.setdefault(msg["round"], {}).setdefault(msg["agent"], Counter()).update(counts)
+
+    if not new_rounds and state["n_docs"] == 0:
+        return {"error": "No debater messages found for analysis."}, state
+
+    term_array = np.array(terms, dtype=object)
+    idf = np.log((1 + state["n_docs"]) / (1 + np.array(doc_freq, dtype=float))) + 1
+
+    def dense(counts: Counter) -> np.ndarray:
+        vec = np.zeros(len(terms))
+        if counts:
+            cols = np.fromiter(counts.keys(), dtype=int, count=len(counts))
+            vec[cols] = np.fromiter(counts.values(), dtype=float, count=len(counts))
+        return vec
+
+    for round_num in sorted(new_rounds):
+        keywords_by_debater = {}
+        for agent_name in sorted(new_rounds[round_num]):
+            round_counts = dense(new_rounds[round_num][agent_name])
+            keywords_by_debater[agent_name] = _score(round_counts, idf, term_array, 5)
+
+            running = np.zeros(len(terms))
+            previous = state["agent_counts"].get(agent_name, [])
+            running[:len(previous)] = previous
+            state["agent_counts"][agent_name] = (running + round_counts).tolist()
+        state["timeline"].append({"round": int(round_num), "keywordsByDebater": keywords_by_debater})
+        state["rounds_done"] = int(round_num)
+
+    agent_vectors = {}
+    for agent_name, counts in state["agent_counts"].items():
+        vec = np.zeros(len(terms))
+        vec[:len(counts)] = counts
+        agent_vectors[agent_name] = vec
+
+    result = {
+        "overallKeywords": _score(sum(agent_vectors.values()), idf, term_array, 15),
+        "keywordsByDebater": {
+            agent_name: _score(vec, idf, term_array, 10) for agent_name, vec in sorted(agent_vectors.items())
+        },
+        "timeline": state["timeline"],
+    }
+    return result, state
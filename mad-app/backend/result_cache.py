@@ -0,0 +1,71 @@
+import json
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from metrics import CACHE_HITS
+
+class ResultCache:
+    """
+    Request-level cache for the analysis endpoints, keyed by a hash of the
+    request payload. Identical requests that arrive while one is still being
+    computed wait on that computation instead of starting their own, and
+    finished results are kept in a bounded LRU. The key doubles as the
+    response's ETag, so a client that already has the result gets a 304
+    without anything being computed or looked up.
+
+    Lives on the event loop: all bookkeeping happens between awaits, so no lock.
+    """
+
+    def __init__(self, name: str, max_entries: int = 256, version: str = ""):
+        self.name = name
+        self.max_entries = max_entries
+        self.version = version  # part of every key; bump it when results change shape
+        self._results: "OrderedDict[str, Any]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def key(self, payload: Any) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{self.name}\n{self.version}\n{canonical}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return f'"{key[:32]}"'
+
+    def not_modified(self, key: str, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if self.etag(key) in tags or "*" in tags:
+            CACHE_HITS.inc(cache=f"{self.name}_etag")
+            return True
+        return False
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._results:
+            self._results.move_to_end(key)
+            CACHE_HITS.inc(cache=self.name)
+            return self._results[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            CACHE_HITS.inc(cache=f"{self.name}_inflight")
+        else:
+            future = asyncio.ensure_future(self._compute(key, compute))
+            self._inflight[key] = future
+        # shield: one caller disconnecting must not cancel the work the others wait on
+        return await asyncio.shield(future)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await compute()
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+            return result
+        finally:
+            # Failures aren't cached; the next identical request tries again
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._results), "inflight": len(self._inflight), "max_entries": self.max_entries}
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+from typing import Dict, Optional
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db")
+
+class SessionStore(ABC):
+    """
+    Holds debate sessions as plain JSON-serializable state (topic, agent configs,
+    message log, round cursor). Live autogen objects are rebuilt from it on demand.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def put(self, session_id: str, state: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+class MemorySessionStore(SessionStore):
+    """In-process store capped at max_sessions (LRU) with a per-session TTL."""
+
+    def __init__(self, max_sessions: int = 500, ttl_seconds: float = 3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+        return json.loads(payload)
+
+    def put(self, session_id: str, state: Dict) -> None:
+        # Store the serialized form so callers can't mutate what's cached
+        payload = json.dumps(state, separators=(",", ":"))
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + self.ttl_seconds, payload)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+class SQLiteSessionStore(SessionStore):
+    """
+    File-backed store that several uvicorn workers can share and that survives
+    restarts. Expired rows are purged on write, and the table is capped at
+    max_sessions by dropping the least recently written sessions. Stores with
+    different `table` names share the file but not their caps.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, max_sessions: int = 5000, ttl_seconds: float = 3600, table: str = "sessions"):
+        self.path = path
+        self.table = table
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " session_id TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_expires ON {table} (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT state FROM {self.table} WHERE session_id = ? AND expires_at >= ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, session_id: str, state: Dict) -> None:
+        now = time.time()
+        payload = json.dumps(state, separators=(",", ":"))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (session_id, state, expires_at) VALUES (?, ?, ?)",
+                (session_id, payload, now + self.ttl_seconds),
+            )
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE session_id IN ("
+                f" SELECT session_id FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+
+    def delete(self, session_id: str) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE session_id = ?", (session_id,))
+
+def get_session_store(table: str = "sessions", max_sessions_env: str = "SESSION_MAX_SESSIONS") -> SessionStore:
+    """
+    Picks the backend from the environment:
+    SESSION_BACKEND=memory (default) or sqlite, plus SESSION_DB_PATH,
+    SESSION_MAX_SESSIONS and SESSION_TTL_SECONDS. Other kinds of per-session
+    state get their own `table` and cap variable, so they never evict sessions.
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            path=os.getenv("SESSION_DB_PATH", DEFAULT_DB_PATH),
+            max_sessions=int(os.getenv(max_sessions_env, "5000")),
+            ttl_seconds=ttl_seconds,
+            table=table,
+        )
+    if backend == "memory":
+        return MemorySessionStore(
+            max_sessions=int(os.getenv(max_sessions_env, "500")),
+            ttl_seconds=ttl_seconds,
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,122 @@
+"""
+A fake OpenAI-compatible chat completions server for benchmarks. It never
+calls a model: replies are filler text generated at a fixed rate after a fixed
+delay, so backend overhead can be measured without spending API money.
+
+    python stub_openai.py --port 8900 --latency 0.3 --tokens-per-sec 80 --completion-tokens 120
+
+Then point the backend at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub uvicorn main:app
+
+Judge-style prompts (asking for "Round Winner") get a winner line, and
+response_format=json_object requests get a MAST verdict with no failures.
+"""
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from typing import Dict, List
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Overwritten from the command line
+SETTINGS = {"latency": 0.3, "tokens_per_sec": 80.0, "completion_tokens": 120}
+
+WORDS = "the argument evidence shows that society benefits because risk policy data outcome however".split()
+
+app = FastAPI()
+
+def _prompt_tokens(messages: List[Dict]) -> int:
+    # ~4 characters per token is close enough for load numbers
+    return sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+
+def _reply(params: Dict) -> List[str]:
+    """The reply as a list of token-sized pieces."""
+    messages = params.get("messages", [])
+    if (params.get("response_format") or {}).get("type") == "json_object":
+        verdict = {
+            "summary": "Both debaters engaged with the topic.",
+            "task_progress": "yes",
+            "failures": [{"id": f"{i}.{j}", "name": "stub", "detected": False} for i, j in ((1, 1), (1, 3), (2, 3), (3, 1))],
+        }
+        text = json.dumps(verdict)
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    limit = min(params.get("max_tokens") or SETTINGS["completion_tokens"], SETTINGS["completion_tokens"])
+    pieces = [random.choice(WORDS) + " " for _ in range(limit)]
+    system = (messages[0].get("content") or "") if messages else ""
+    if "Round Winner" in system:
+        pieces.append(f"\nRound Winner: {random.choice(['Debater_A', 'Debater_B'])}")
+    return pieces
+
+async def _paced(pieces: List[str]):
+    """Yields pieces after the first-token latency, at tokens_per_sec."""
+    await asyncio.sleep(SETTINGS["latency"])
+    interval = 1.0 / SETTINGS["tokens_per_sec"] if SETTINGS["tokens_per_sec"] > 0 else 0
+    for piece in pieces:
+        yield piece
+        if interval:
+            await asyncio.sleep(interval)
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    params = await request.json()
+    pieces = _reply(params)
+    usage = {
+        "prompt_tokens": _prompt_tokens(params.get("messages", [])),
+        "completion_tokens": len(pieces),
+        "total_tokens": 0,
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    response_id, created, model = f"chatcmpl-{uuid.uuid4().hex}", int(time.time()), params.get("model", "stub")
+
+    if not params.get("stream"):
+        text = "".join([piece async for piece in _paced(pieces)])
+        return JSONResponse({
+            "id": response_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    include_usage = (params.get("stream_options") or {}).get("include_usage", False)
+
+    async def events():
+        def chunk(delta: Dict, finish_reason=None, chunk_usage=None, choices=True) -> str:
+            body = {
+                "id": response_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if choices else [],
+                "usage": chunk_usage,
+            }
+            return f"data: {json.dumps(body)}\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        async for piece in _paced(pieces):
+            yield chunk({"content": piece})
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, chunk_usage=usage, choices=False)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=SETTINGS["latency"], help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=SETTINGS["tokens_per_sec"], help="0 = no pacing")
+    parser.add_argument("--completion-tokens", type=int, default=SETTINGS["completion_tokens"])
+    args = parser.parse_args()
+
+    SETTINGS.update(latency=args.latency, tokens_per_sec=args.tokens_per_sec, completion_tokens=args.completion_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
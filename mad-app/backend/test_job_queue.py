@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import httpx
+
+import debate_logic
+import main
+from job_queue import JobQueue, SessionBusy
+
+class BlockingEngine:
+    """Stands in for DebateEngine: plays one fake round once `release` is set."""
+    release = threading.Event()
+
+    def __init__(self, topic, agents_config, summary=None):
+        self.summary = summary
+        self.turn_stats = []
+
+    def run_round(self, transcript, on_message=None, on_delta=None, cancel_token=None):
+        BlockingEngine.release.wait(timeout=10)
+        round_num = (transcript[-1]["round"] if transcript else 0) + 1
+        messages = [{"round": round_num, "agent": name, "content": f"{name} round {round_num}"}
+                    for name in ("Debater_A", "Debater_B", "Judge")]
+        transcript.extend(messages)
+        return messages
+
+def test_concurrent_continues_on_one_session(monkeypatch):
+    monkeypatch.setattr(debate_logic, "DebateEngine", BlockingEngine)
+    monkeypatch.setattr(main, "JOBS", JobQueue(max_workers=4, max_queued=4))
+    BlockingEngine.release.clear()
+    debate_logic.SESSIONS.put("s1", {"topic": "t", "agents_config": [], "messages": [], "metrics": {}})
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/api/continue-debate", json={"session_id": "s1"}))
+            while main.JOBS.stats()["running"] == 0:
+                await asyncio.sleep(0.01)
+            second = await client.post("/api/continue-debate", json={"session_id": "s1"})
+            BlockingEngine.release.set()
+            return await first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 200
+    assert second.status_code == 409
+    # Exactly the round the accepted request returned was saved
+    saved = debate_logic.SESSIONS.get("s1")["messages"]
+    assert saved == first.json()["messages"]
+
+def test_session_free_again_after_job_finishes():
+    queue = JobQueue(max_workers=1, max_queued=1)
+    release = threading.Event()
+    job = queue.submit("continue", lambda token: release.wait(timeout=10) and {}, session_id="s1")
+    try:
+        queue.submit("continue", lambda token: {}, session_id="s1")
+        assert False, "second job on a busy session was accepted"
+    except SessionBusy as e:
+        assert e.job_id == job.id
+    release.set()
+    job.future.result(timeout=10)
+    queue.submit("continue", lambda token: {}, session_id="s1").future.result(timeout=10)
@@ -0,0 +1,36 @@
+"""
+Reading Judge verdicts, shared by the live engine (debate_engine.py) and the
+offline runner (debate.py at the repo root), so both score rounds the same way.
+Standard library only, so debate.py can import it without the backend's deps.
+"""
+import re
+from typing import List, Dict, Optional, Tuple
+
+def parse_round_winner(content: str, debaters: List[str]) -> Optional[str]:
+    """The debater named on the last "Round Winner:" line, if it's one of `debaters`."""
+    matches = re.findall(r"Round Winner:\s*\**\s*(Debater_[A-Z])", content, re.IGNORECASE)
+    if not matches:
+        return None
+    name = "Debater_" + matches[-1][-1].upper()
+    return name if name in debaters else None
+
+def aggregate_votes(votes: List[Dict], method: str = "majority") -> Tuple[Optional[str], float]:
+    """
+    Combines panel votes into (winner, agreement). "majority" counts one vote
+    per judge; "weighted" sums each judge's weight. Ties go to whichever tied
+    debater the earliest judge in the panel picked. Agreement is the share of
+    judges who voted for the winner.
+    """
+    if method not in ("majority", "weighted"):
+        raise ValueError(f"Unknown aggregation method: {method}")
+    tally: Dict[str, float] = {}
+    for vote in votes:
+        if vote["winner"]:
+            tally[vote["winner"]] = tally.get(vote["winner"], 0) + (vote["weight"] if method == "weighted" else 1)
+    if not tally:
+        return None, 0.0
+    best = max(tally.values())
+    leaders = {name for name, score in tally.items() if score == best}
+    winner = next(vote["winner"] for vote in votes if vote["winner"] in leaders)
+    agreement = sum(1 for vote in votes if vote["winner"] == winner) / len(votes)
+    return winner, agreement
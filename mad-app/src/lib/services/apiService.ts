@@ -1,38 +1,126 @@
-import type { AgentConfig, Message, AnalysisResult } from '$lib/types.ts';
+import type { AgentConfig, AgentName, Message, AnalysisResult } from '$lib/types.ts';
 
 const API_BASE = 'http://127.0.0.1:8000/api';
 
+export interface MetricTotals {
+    seconds: number;
+    llm_calls: number;
+    cache_hits: number;
+    prompt_tokens: number;
+    completion_tokens: number;
+}
+
+// Per-turn timings and token usage the backend reports with every round
+export interface SessionMetrics {
+    turns: { agent: string; round: number; seconds: number; prompt_tokens: number | null; completion_tokens: number | null; cached: boolean }[];
+    round: MetricTotals;
+    session: MetricTotals;
+}
+
 export interface SessionResponse {
     session_id: string;
     messages: Message[];
+    metrics?: SessionMetrics;
     error?: string;
 }
 
-export const startDebateSession = async (topic: string, agents: AgentConfig[]): Promise<SessionResponse> => {
-    const response = await fetch(`${API_BASE}/start-debate`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ topic, agents_config: agents })
-    });
-    if (!response.ok) throw new Error('Failed to start session');
-    return response.json();
+// Last results of the analysis endpoint by request body. The backend tags each
+// result with an ETag derived from the payload; sending it back as If-None-Match
+// turns a repeated request into a 304 instead of a recomputation.
+const ANALYSIS_CACHE_SIZE = 32;
+const analysisCache = new Map<string, { etag: string; result: any }>();
+
+const postAnalysis = async (path: string, payload: unknown): Promise<any> => {
+    const body = JSON.stringify(payload);
+    const cached = analysisCache.get(body);
+    const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+    if (cached) headers['If-None-Match'] = cached.etag;
+
+    const response = await fetch(`${API_BASE}${path}`, { method: 'POST', headers, body });
+    if (response.status === 304 && cached) return cached.result;
+    if (!response.ok) throw new Error(`Server responded with ${response.status}`);
+
+    const result = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        analysisCache.delete(body);
+        analysisCache.set(body, { etag, result });
+        if (analysisCache.size > ANALYSIS_CACHE_SIZE) analysisCache.delete(analysisCache.keys().next().value!);
+    }
+    return result;
 };
 
-export const continueDebateSession = async (session_id: string): Promise<SessionResponse> => {
-    const response = await fetch(`${API_BASE}/continue-debate`, {
+// MAST failure-mode verdict for one round. Passing `prefilter` (the topic and
+// earlier turns) turns on the backend's local pre-filter; without it only the
+// round itself is sent, so the payload doesn't grow with the debate.
+export const analyzeTaxonomy = (
+    messages: Message[],
+    prefilter?: { topic: string; history: Message[] }
+): Promise<any> =>
+    postAnalysis('/analyze-taxonomy', prefilter ? { messages, ...prefilter, prefilter: true } : { messages });
+
+// Server-side analysis of a live session; only the session id is sent
+export const analyzeSession = async (session_id: string): Promise<AnalysisResult> => {
+    const response = await fetch(`${API_BASE}/analyze-session`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ session_id })
     });
-    if (!response.ok) throw new Error('Failed to continue session');
     return response.json();
 };
 
-export const analyzeDebate = async (messages: Message[]): Promise<AnalysisResult> => {
-    const response = await fetch(`${API_BASE}/analyze-debate`, {
+export type StreamEvent =
+    | { event: 'session'; data: { session_id: string; job_id: string } }
+    | { event: 'delta'; data: { round: number; agent: AgentName; delta: string } }
+    | { event: 'message'; data: Message }
+    | { event: 'done'; data: SessionResponse }
+    | { event: 'cancelled'; data: { job_id: string } };
+
+// Reads the backend's server-sent events off a POST response as they arrive.
+const streamEvents = async (path: string, body: unknown, onEvent: (e: StreamEvent) => void): Promise<void> => {
+    const response = await fetch(`${API_BASE}/${path}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ messages })
+        body: JSON.stringify(body)
     });
-    return response.json();
-};
\ No newline at end of file
+    if (response.status === 429) {
+        throw new Error(`Server is busy, try again in ${response.headers.get('Retry-After') ?? 'a few'} seconds`);
+    }
+    if (response.status === 409) throw new Error('A round is already in progress for this debate');
+    if (!response.ok || !response.body) throw new Error('Failed to open debate stream');
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+
+        let boundary: number;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            const payload = JSON.parse(data);
+            if (event === 'error') throw new Error(payload.detail);
+            onEvent({ event, data: payload } as StreamEvent);
+        }
+    }
+};
+
+export const streamStartDebate = (topic: string, agents: AgentConfig[], onEvent: (e: StreamEvent) => void) =>
+    streamEvents('start-debate/stream', { topic, agents_config: agents }, onEvent);
+
+export const streamContinueDebate = (session_id: string, onEvent: (e: StreamEvent) => void) =>
+    streamEvents('continue-debate/stream', { session_id }, onEvent);
+
+// Stops a queued or running debate job; a running round stops before the next agent speaks
+export const cancelJob = async (job_id: string): Promise<void> => {
+    await fetch(`${API_BASE}/jobs/${job_id}/cancel`, { method: 'POST' });
+};
@@ -5,11 +5,36 @@ export interface Message {
     agent: AgentName;
     content: string;
     round: number;
+    panel?: PanelVerdict; // Judge messages from a judge panel
+}
+
+export interface PanelVerdict {
+    aggregation: 'majority' | 'weighted';
+    winner: AgentName | null;
+    agreement: number; // share of judges who voted for the winner
+    votes: { judge: number; model: string; weight: number; winner: AgentName | null }[];
+}
+
+export interface PanelJudge {
+    model?: string;
+    systemMessage?: string;
+    weight?: number;
+}
+
+// Mirrors DEFAULT_CONTEXT_POLICY in debate_engine.py
+export interface ContextPolicy {
+    mode: 'full' | 'last_k' | 'summary';
+    window?: number;
+    maxPromptTokens?: number | null;
 }
 
 export interface AgentConfig {
     name: AgentName;
     systemMessage: string;
+    contextPolicy?: ContextPolicy;
+    // Judge only: several judges decide each round in parallel
+    panel?: PanelJudge[];
+    aggregation?: 'majority' | 'weighted';
 }
 
 // Matches the return dictionary from debate_logic.py -> run_debate()
@@ -1,28 +1,39 @@
+import os
+import sys
 import json
 import pandas as pd
 import re
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer # <-- IMPORTED CountVectorizer
 from bertopic import BERTopic
-from sentence_transformers import SentenceTransformer
+from embedding_cache import EmbeddingCache, get_embedding_model
+from transcript_store import read_messages
+from topic_model import MODEL_DIR as TOPIC_MODEL_DIR, assign_topics, load_model as load_topic_model
+from collections import Counter
 
 
 
-def run_analysis():
-    # --- 1. Load Data from JSON ---
+def run_analysis(path='debate_history.json', **filters):
+    # --- 1. Load Data ---
+    # `path` can be a debate_history.json, a JSONL transcript log or a Parquet
+    # archive; for the archive only the agent/content columns of the rows
+    # matching `filters` (debate_id, topic, agents, min_round, max_round) are read
     try:
-        with open('debate_history.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        print("Successfully loaded debate_history.json")
+        messages = read_messages(path, columns=['agent', 'content'], **filters)
+        print(f"Successfully loaded {len(messages)} messages from {path}")
     except FileNotFoundError:
-        print("Error: 'debate_history.json' not found.")
-        print("Please make sure the JSON file is in the same directory as this script.")
+        print(f"Error: '{path}' not found.")
+        print("Please make sure the file is in the same directory as this script.")
         return
     except json.JSONDecodeError:
-        print("Error: 'debate_history.json' is not a valid JSON file.")
+        print(f"Error: '{path}' is not a valid JSON file.")
+        return
+
+    if not messages:
+        print("Error: No messages matched. Cannot run analysis.")
         return
 
     # Load messages into a DataFrame
-    df = pd.DataFrame(data['messages'])
+    df = pd.DataFrame(messages)
 
     # Prepare a "clean" text column for NLP
     df['clean_content'] = df['content'].apply(lambda x: re.sub(r"^\s*Debater_[AB]:\s*", "", x, flags=re.IGNORECASE))
@@ -85,35 +96,52 @@ def run_analysis():
     print("="*50)
     
     try:
-        embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-        
-        min_topic_size = 2 
-        
-        vectorizer_model = CountVectorizer(stop_words="english") 
-        
-        print(f"Running BERTopic with min_topic_size={min_topic_size} and stop-word removal...")
-        
-        topic_model = BERTopic(
-            embedding_model=embedding_model,
-            min_topic_size=min_topic_size,
-            vectorizer_model=vectorizer_model, 
-            verbose=True
-        )
-        
-        topics, probabilities = topic_model.fit_transform(debate_documents)
-        
-        print("\nBERTopic analysis complete.")
-        
-        print("\nTopics found (Topic -1 = Outliers):")
-        print(topic_model.get_topic_info())
-        
-        print("\nKeywords for each main topic:")
-        for topic_id in topic_model.get_topics().keys():
-            if topic_id == -1:
-                continue 
-            
-            topic_words = [word for word, score in topic_model.get_topic(topic_id)][:7]
-            print(f"Topic {topic_id}:", ", ".join(topic_words))
+        if os.path.isdir(TOPIC_MODEL_DIR):
+            # Saved reference model: topics are assigned, not refitted, so the
+            # IDs line up with every other debate analyzed against it
+            print(f"Assigning topics with the saved model in '{TOPIC_MODEL_DIR}'...")
+            topic_model = load_topic_model(TOPIC_MODEL_DIR)
+            topics, probabilities = assign_topics(debate_documents, TOPIC_MODEL_DIR)
+            assigned = Counter(topics)
+
+            print("\nTopics in this debate (Topic -1 = Outliers):")
+            for topic_id, count in assigned.most_common():
+                topic_words = [word for word, score in topic_model.get_topic(topic_id) or []][:7]
+                print(f"Topic {topic_id} ({count} messages):", ", ".join(topic_words))
+        else:
+            # Shared model instance; embeddings come from the on-disk cache so only
+            # messages never seen before are actually encoded
+            embedding_model = get_embedding_model()
+            embeddings = EmbeddingCache().encode(debate_documents)
+
+            min_topic_size = 2
+
+            vectorizer_model = CountVectorizer(stop_words="english")
+
+            print(f"Running BERTopic with min_topic_size={min_topic_size} and stop-word removal...")
+            print("(No saved topic model; run 'python topic_model.py fit <transcripts>' for topic IDs that are stable across debates.)")
+
+            topic_model = BERTopic(
+                embedding_model=embedding_model,
+                min_topic_size=min_topic_size,
+                vectorizer_model=vectorizer_model,
+                verbose=True
+            )
+
+            topics, probabilities = topic_model.fit_transform(debate_documents, embeddings=embeddings)
+
+            print("\nBERTopic analysis complete.")
+
+            print("\nTopics found (Topic -1 = Outliers):")
+            print(topic_model.get_topic_info())
+
+            print("\nKeywords for each main topic:")
+            for topic_id in topic_model.get_topics().keys():
+                if topic_id == -1:
+                    continue
+
+                topic_words = [word for word, score in topic_model.get_topic(topic_id)][:7]
+                print(f"Topic {topic_id}:", ", ".join(topic_words))
 
     except ImportError:
         print("\nError: BERTopic or SentenceTransformers not found.")
@@ -124,4 +152,9 @@ def run_analysis():
 
 # --- Run the main function ---
 if __name__ == "__main__":
-    run_analysis()
\ No newline at end of file
+    # python nlp.py --corpus runs/*.jsonl  -> streaming analysis over many debates
+    if sys.argv[1:2] == ["--corpus"]:
+        from corpus_nlp import run_corpus_analysis, print_report
+        print_report(run_corpus_analysis(sys.argv[2:]))
+    else:
+        run_analysis(*sys.argv[1:2])
\ No newline at end of file
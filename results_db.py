@@ -0,0 +1,261 @@
+"""
+SQLite store of debate outcomes with a running Elo leaderboard.
+
+A "player" is one debater seat with one system prompt: (agent name, SHA-256
+of the prompt). It's the thing a prompt variant changes. Every parsed Judge
+verdict is written together with the Elo / win-loss update of the two players
+in that round, in one transaction. Leaderboard and win-rate queries then read
+the small ratings table or indexed columns and never touch transcripts.
+
+    python results_db.py leaderboard
+    python results_db.py win-rates --by variant
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from contextlib import closing
+
+DEFAULT_DB_PATH = "results.db"
+ELO_K = 32
+ELO_START = 1500.0
+
+
+def config_hash(value):
+    """Stable hash of a prompt string or a {agent: prompt} dict."""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def player_id(agent, prompt):
+    return f"{agent}:{config_hash(prompt)}"
+
+
+def elo_update(winner_rating, loser_rating, k=ELO_K):
+    """New (winner, loser) ratings after one decided round."""
+    expected = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
+    delta = k * (1 - expected)
+    return winner_rating + delta, loser_rating - delta
+
+
+class ResultsDB:
+    """
+    Opens a short-lived connection per call (like the backend's session
+    store), so the batch runner's worker threads and separate processes can
+    all write to the same file. WAL mode lets readers run alongside them.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS debates (
+                    debate_id TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    config_hash TEXT NOT NULL,
+                    variant TEXT,
+                    prompts TEXT NOT NULL,
+                    players TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    winner TEXT,
+                    rounds_played INTEGER DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_debates_topic ON debates (topic);
+                CREATE INDEX IF NOT EXISTS idx_debates_config ON debates (config_hash);
+                CREATE INDEX IF NOT EXISTS idx_debates_started ON debates (started_at);
+                CREATE INDEX IF NOT EXISTS idx_debates_variant ON debates (variant);
+
+                CREATE TABLE IF NOT EXISTS verdicts (
+                    debate_id TEXT NOT NULL,
+                    round INTEGER NOT NULL,
+                    winner TEXT,
+                    rating_changes TEXT NOT NULL DEFAULT '[]',
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (debate_id, round)
+                );
+                CREATE INDEX IF NOT EXISTS idx_verdicts_created ON verdicts (created_at);
+
+                CREATE TABLE IF NOT EXISTS ratings (
+                    player_id TEXT PRIMARY KEY,
+                    agent TEXT NOT NULL,
+                    config_hash TEXT NOT NULL,
+                    rating REAL NOT NULL,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_ratings_rating ON ratings (rating DESC);
+                CREATE INDEX IF NOT EXISTS idx_ratings_config ON ratings (config_hash);
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")  # safe under WAL; skips an fsync per verdict
+        return conn
+
+    def start_debate(self, debate_id, topic, prompts, debaters, variant=None):
+        """
+        Registers a debate and its players before the first verdict comes in.
+        Starting a debate_id again (a crashed run being re-run) first takes
+        back everything its earlier attempt added to the leaderboard.
+        """
+        players = {agent: player_id(agent, prompts[agent]) for agent in debaters}
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._revert_verdicts(conn, debate_id, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO debates (debate_id, topic, config_hash, variant, prompts, players, started_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (debate_id, topic, config_hash(prompts), variant, json.dumps(prompts), json.dumps(players), now),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO ratings (player_id, agent, config_hash, rating, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(pid, agent, config_hash(prompts[agent]), ELO_START, now) for agent, pid in players.items()],
+            )
+        return players
+
+    def record_verdict(self, debate_id, round_num, winner):
+        """
+        Stores one round's verdict and applies it to the leaderboard: the
+        winner's player beats each other debater's player in that debate.
+        A round seen twice within one attempt (e.g. a retried write) is only
+        counted once.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")  # the rating read-modify-write must not interleave
+            try:
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO verdicts (debate_id, round, winner, created_at) VALUES (?, ?, ?, ?)",
+                    (debate_id, round_num, winner, now),
+                ).rowcount
+                conn.execute(
+                    "UPDATE debates SET rounds_played = MAX(rounds_played, ?) WHERE debate_id = ?",
+                    (round_num, debate_id),
+                )
+                row = conn.execute("SELECT players FROM debates WHERE debate_id = ?", (debate_id,)).fetchone()
+                if inserted and winner and row:
+                    players = json.loads(row[0])
+                    if winner in players:
+                        changes = self._apply_elo(conn, players[winner], [pid for agent, pid in players.items() if agent != winner], now)
+                        conn.execute(
+                            "UPDATE verdicts SET rating_changes = ? WHERE debate_id = ? AND round = ?",
+                            (json.dumps(changes), debate_id, round_num),
+                        )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @staticmethod
+    def _apply_elo(conn, winner_id, loser_ids, now):
+        """Updates the ratings; returns the [winner, loser, delta] applied, so it can be reverted."""
+        changes = []
+        for loser_id in loser_ids:
+            ratings = dict(conn.execute(
+                "SELECT player_id, rating FROM ratings WHERE player_id IN (?, ?)", (winner_id, loser_id)
+            ).fetchall())
+            new_winner, new_loser = elo_update(ratings[winner_id], ratings[loser_id])
+            conn.execute(
+                "UPDATE ratings SET rating = ?, wins = wins + 1, updated_at = ? WHERE player_id = ?",
+                (new_winner, now, winner_id),
+            )
+            conn.execute(
+                "UPDATE ratings SET rating = ?, losses = losses + 1, updated_at = ? WHERE player_id = ?",
+                (new_loser, now, loser_id),
+            )
+            changes.append([winner_id, loser_id, new_winner - ratings[winner_id]])
+        return changes
+
+    @staticmethod
+    def _revert_verdicts(conn, debate_id, now):
+        # Ratings have moved on since, so this takes back the exact deltas
+        # rather than replaying history without those rounds
+        rows = conn.execute("SELECT rating_changes FROM verdicts WHERE debate_id = ?", (debate_id,)).fetchall()
+        for (changes,) in rows:
+            for winner_id, loser_id, delta in json.loads(changes):
+                conn.execute(
+                    "UPDATE ratings SET rating = rating - ?, wins = wins - 1, updated_at = ? WHERE player_id = ?",
+                    (delta, now, winner_id),
+                )
+                conn.execute(
+                    "UPDATE ratings SET rating = rating + ?, losses = losses - 1, updated_at = ? WHERE player_id = ?",
+                    (delta, now, loser_id),
+                )
+        conn.execute("DELETE FROM verdicts WHERE debate_id = ?", (debate_id,))
+
+    def finish_debate(self, debate_id, winner, rounds_played):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE debates SET finished_at = ?, winner = ?, rounds_played = ? WHERE debate_id = ?",
+                (time.time(), winner, rounds_played, debate_id),
+            )
+
+    def leaderboard(self, limit=20, agent=None):
+        query = "SELECT player_id, agent, config_hash, rating, wins, losses FROM ratings"
+        params = []
+        if agent:
+            query += " WHERE agent = ?"
+            params.append(agent)
+        query += " ORDER BY rating DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                "player_id": pid, "agent": agent_name, "config_hash": chash, "rating": round(rating, 1),
+                "wins": wins, "losses": losses,
+                "win_rate": round(wins / (wins + losses), 3) if wins + losses else None,
+            }
+            for pid, agent_name, chash, rating, wins, losses in rows
+        ]
+
+    def win_rates(self, by="config_hash", topic=None, since=None):
+        """
+        Finished debates grouped by `by` ("config_hash", "variant" or "topic"):
+        how many were played and how often each side won overall.
+        """
+        if by not in ("config_hash", "variant", "topic"):
+            raise ValueError(f"Can't group by {by}")
+        query = (
+            f"SELECT {by}, COUNT(*),"
+            " SUM(winner = 'Debater_A'), SUM(winner = 'Debater_B'), SUM(winner = 'Tie')"
+            " FROM debates WHERE finished_at IS NOT NULL"
+        )
+        params = []
+        if topic is not None:
+            query += " AND topic = ?"
+            params.append(topic)
+        if since is not None:
+            query += " AND started_at >= ?"
+            params.append(since)
+        query += f" GROUP BY {by} ORDER BY COUNT(*) DESC"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {by: key, "debates": n, "Debater_A": a / n, "Debater_B": b / n, "Tie": t / n}
+            for key, n, a, b, t in rows
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the debate results database.")
+    parser.add_argument("command", choices=["leaderboard", "win-rates"])
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--by", default="config_hash", choices=["config_hash", "variant", "topic"])
+    parser.add_argument("--topic")
+    parser.add_argument("--agent")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    db = ResultsDB(args.db)
+    if args.command == "leaderboard":
+        for i, row in enumerate(db.leaderboard(args.limit, args.agent), 1):
+            print(f"{i:>3}. {row['player_id']:<32} {row['rating']:>7.1f}  {row['wins']}W-{row['losses']}L")
+    else:
+        for row in db.win_rates(args.by, args.topic):
+            print(f"{str(row[args.by])[:40]:<40} n={row['debates']:<5} A={row['Debater_A']:.0%} B={row['Debater_B']:.0%} tie={row['Tie']:.0%}")
@@ -0,0 +1,32 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mad-app", "backend"))
+
+from corpus_nlp import analyze_chunk, build_report, merge
+from nlp_logic import perform_analysis
+
+MESSAGES = [
+    {"round": 1, "agent": "Debater_A", "content": "Debater_A: Automation raises productivity and wages."},
+    {"round": 1, "agent": "Debater_B", "content": "Automation concentrates wealth and erodes privacy."},
+    {"round": 1, "agent": "Judge", "content": "Round Winner: Debater_A"},
+    {"round": 2, "agent": "Debater_A", "content": "Medical diagnosis improves with machine learning."},
+    {"round": 2, "agent": "Debater_B", "content": "Surveillance grows with machine learning."},
+    {"round": 2, "agent": "Judge", "content": "Round Winner: Debater_B"},
+]
+
+def test_corpus_report_has_the_session_analysis_shape(tmp_path):
+    path = tmp_path / "debate.json"
+    path.write_text(json.dumps({"topic": "AI", "messages": MESSAGES}), encoding="utf-8")
+    total = merge({"n_docs": 0, "doc_freq": None, "groups": {}, "names": {}}, analyze_chunk(("files", [str(path)])))
+    corpus = build_report(total)
+    session = perform_analysis(MESSAGES)
+
+    # The corpus report only adds a message count on top
+    assert set(corpus) - {"debaterMessages"} == set(session)
+    assert set(corpus["keywordsByDebater"]) == set(session["keywordsByDebater"])
+    assert [set(entry) for entry in corpus["timeline"]] == [set(entry) for entry in session["timeline"]]
+    for corpus_entry, session_entry in zip(corpus["timeline"], session["timeline"]):
+        assert set(corpus_entry["keywordsByDebater"]) == set(session_entry["keywordsByDebater"])
+    assert set(corpus["overallKeywords"][0]) == set(session["overallKeywords"][0])
@@ -0,0 +1,132 @@
+"""
+A BERTopic model fitted once and reused, so topic IDs mean the same thing in
+every debate.
+
+    python topic_model.py fit runs/*.jsonl          # fit on a reference corpus
+    python topic_model.py update new_runs/*.jsonl   # fold in newer debates
+    python topic_model.py assign debate_history.jsonl
+
+The model is saved with safetensors serialization: only the topic embeddings
+and c-TF-IDF representations are kept, not UMAP/HDBSCAN. Assigning topics to
+a new debate is then a cosine-similarity lookup against the topic embeddings,
+done on embeddings from the on-disk cache. It takes milliseconds and always
+gives the same answer for the same text. update() fits a small model on the
+new debates and merges it in: existing topics keep their IDs, and only
+genuinely new topics are appended.
+"""
+import os
+import re
+import sys
+import threading
+
+from embedding_cache import EmbeddingCache, get_embedding_model, MODEL_NAME
+from transcript_store import read_messages
+
+MODEL_DIR = ".topic_model"
+MIN_TOPIC_SIZE = 10
+MERGE_MIN_SIMILARITY = 0.7
+
+_models = {}
+_model_lock = threading.Lock()
+
+
+def load_documents(paths):
+    """Debater messages (prefix-stripped) from transcript files or a Parquet archive."""
+    documents = []
+    for path in paths:
+        for message in read_messages(path, columns=["agent", "content"], agents=["Debater_A", "Debater_B"]):
+            text = re.sub(r"^\s*Debater_[AB]:\s*", "", message["content"] or "", flags=re.IGNORECASE)
+            if text:
+                documents.append(text)
+    return documents
+
+
+def _fit(documents, min_topic_size):
+    from bertopic import BERTopic
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    topic_model = BERTopic(
+        embedding_model=get_embedding_model(),
+        min_topic_size=min_topic_size,
+        vectorizer_model=CountVectorizer(stop_words="english"),
+        verbose=True,
+    )
+    topic_model.fit(documents, embeddings=EmbeddingCache().encode(documents))
+    return topic_model
+
+
+def _save(topic_model, model_dir):
+    topic_model.save(model_dir, serialization="safetensors", save_ctfidf=True, save_embedding_model=MODEL_NAME)
+    with _model_lock:
+        _models.pop(model_dir, None)  # next load_model() picks up the new version
+
+
+def load_model(model_dir=MODEL_DIR):
+    """The saved model, loaded once per process."""
+    if model_dir not in _models:
+        with _model_lock:
+            if model_dir not in _models:
+                from bertopic import BERTopic
+                if not os.path.isdir(model_dir):
+                    raise FileNotFoundError(f"No topic model at '{model_dir}'. Run: python topic_model.py fit <transcripts>")
+                _models[model_dir] = BERTopic.load(model_dir, embedding_model=get_embedding_model())
+    return _models[model_dir]
+
+
+def fit(paths, model_dir=MODEL_DIR, min_topic_size=MIN_TOPIC_SIZE):
+    """Fits the reference model on every debate under `paths` and saves it."""
+    documents = load_documents(paths)
+    print(f"Fitting topic model on {len(documents)} messages...")
+    topic_model = _fit(documents, min_topic_size)
+    _save(topic_model, model_dir)
+    print(f"Saved topic model with {len(topic_model.get_topic_info())} topics to {model_dir}")
+    return topic_model
+
+
+def update(paths, model_dir=MODEL_DIR, min_topic_size=MIN_TOPIC_SIZE, min_similarity=MERGE_MIN_SIMILARITY):
+    """
+    Fits a model on the new debates only and merges it into the saved one.
+    Topics closer than min_similarity to an existing topic are folded into it;
+    the rest are appended with new IDs.
+    """
+    from bertopic import BERTopic
+
+    base = load_model(model_dir)
+    documents = load_documents(paths)
+    print(f"Fitting update on {len(documents)} new messages...")
+    merged = BERTopic.merge_models(
+        [base, _fit(documents, min_topic_size)],
+        min_similarity=min_similarity,
+        embedding_model=get_embedding_model(),
+    )
+    added = len(merged.get_topic_info()) - len(base.get_topic_info())
+    _save(merged, model_dir)
+    print(f"Merged {added} new topics into {model_dir}")
+    return merged
+
+
+def assign_topics(documents, model_dir=MODEL_DIR):
+    """(topic ids, probabilities) for `documents` against the saved model; nothing is refitted."""
+    if not documents:
+        return [], []
+    topic_model = load_model(model_dir)
+    return topic_model.transform(documents, embeddings=EmbeddingCache().encode(documents))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("fit", "update", "assign"):
+        print("Usage: python topic_model.py fit|update|assign <transcripts...>")
+        sys.exit(1)
+
+    command, paths = sys.argv[1], sys.argv[2:]
+    if command == "fit":
+        fit(paths)
+    elif command == "update":
+        update(paths)
+    else:
+        documents = load_documents(paths)
+        topics, _ = assign_topics(documents)
+        topic_model = load_model()
+        for document, topic_id in zip(documents, topics):
+            words = [word for word, _ in topic_model.get_topic(topic_id) or []][:5]
+            print(f"[{topic_id}] {', '.join(words)} :: {document[:80]}")
@@ -0,0 +1,168 @@
+"""
+Debate transcripts on disk.
+
+Each message is appended to a JSONL log as soon as it exists, so a crash
+loses at most the message in flight. compact() then folds finished logs into a
+Parquet archive (a directory of part files with debate_id/topic/round/agent
+columns) that read_messages() can scan with column and predicate pushdown.
+"""
+import os
+import json
+import time
+import uuid
+
+ARCHIVE_COLUMNS = ["debate_id", "topic", "round", "agent", "content", "ts"]
+
+
+class TranscriptLog:
+    """
+    Append-only JSONL log of one debate's messages. A new log starts empty,
+    so a restarted run doesn't inherit the partial log of a crashed one;
+    pass resume=True to keep appending to an existing file.
+    """
+
+    def __init__(self, path, debate_id=None, topic=None, resume=False):
+        self.path = path
+        self.debate_id = debate_id or os.path.splitext(os.path.basename(path))[0]
+        self.topic = topic
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not resume:
+            open(path, "w", encoding="utf-8").close()
+
+    def append(self, round_num, agent, content):
+        record = {
+            "debate_id": self.debate_id,
+            "topic": self.topic,
+            "round": round_num,
+            "agent": agent,
+            "content": content,
+            "ts": time.time(),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return record
+
+
+def iter_jsonl(path):
+    """Yields the records of a JSONL log, skipping a torn final line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("The Parquet archive needs pyarrow. Please run: pip install pyarrow")
+
+
+def compact(jsonl_paths, archive_dir, batch_rows=50_000):
+    """
+    Writes the given JSONL logs to a new part file in archive_dir, one row
+    group per batch, so memory stays bounded by batch_rows. Returns the part path.
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("debate_id", pa.string()),
+        ("topic", pa.string()),
+        ("round", pa.int32()),
+        ("agent", pa.string()),
+        ("content", pa.string()),
+        ("ts", pa.float64()),
+    ])
+    os.makedirs(archive_dir, exist_ok=True)
+    part_path = os.path.join(archive_dir, f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet")
+
+    with pq.ParquetWriter(part_path, schema, compression="zstd") as writer:
+        batch = []
+        for path in jsonl_paths:
+            for record in iter_jsonl(path):
+                batch.append({column: record.get(column) for column in ARCHIVE_COLUMNS})
+                if len(batch) >= batch_rows:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    return part_path
+
+
+def _archive_filter(debate_id=None, topic=None, agents=None, min_round=None, max_round=None):
+    import pyarrow.dataset as ds
+
+    conditions = []
+    if debate_id is not None:
+        conditions.append(ds.field("debate_id") == debate_id)
+    if topic is not None:
+        conditions.append(ds.field("topic") == topic)
+    if agents is not None:
+        conditions.append(ds.field("agent").isin(list(agents)))
+    if min_round is not None:
+        conditions.append(ds.field("round") >= min_round)
+    if max_round is not None:
+        conditions.append(ds.field("round") <= max_round)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_messages(path, columns=None, **filters):
+    """
+    Messages as a list of dicts from a Parquet archive (file or directory), a
+    JSONL log or a legacy debate_history.json. Filters: debate_id, topic,
+    agents, min_round, max_round. For Parquet, the columns and filters are
+    pushed down to the scan, so only the matching row groups and columns are read.
+    """
+    if path.endswith(".parquet") or os.path.isdir(path):
+        _require_pyarrow()
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(path, format="parquet")
+        table = dataset.to_table(columns=columns, filter=_archive_filter(**filters))
+        return table.to_pylist()
+
+    if path.endswith(".jsonl"):
+        records = iter_jsonl(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = ({"topic": data.get("topic"), **m} for m in data["messages"])
+
+    def keep(record):
+        if filters.get("debate_id") is not None and record.get("debate_id") != filters["debate_id"]:
+            return False
+        if filters.get("topic") is not None and record.get("topic") != filters["topic"]:
+            return False
+        if filters.get("agents") is not None and record.get("agent") not in filters["agents"]:
+            return False
+        if filters.get("min_round") is not None and record.get("round", 0) < filters["min_round"]:
+            return False
+        if filters.get("max_round") is not None and record.get("round", 0) > filters["max_round"]:
+            return False
+        return True
+
+    rows = [r for r in records if keep(r)]
+    if columns:
+        rows = [{c: r.get(c) for c in columns} for r in rows]
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact JSONL debate logs into the Parquet archive.")
+    parser.add_argument("logs", nargs="+", help="JSONL transcript logs")
+    parser.add_argument("--archive", default="debate_archive")
+    args = parser.parse_args()
+    print(f"Wrote {compact(args.logs, args.archive)}")